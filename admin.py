@@ -0,0 +1,205 @@
+import json
+import os
+import socketserver
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app_logger import get_logger
+from tenants import Tenant
+
+logger = get_logger(__name__)
+
+MAX_BODY_SIZE = 64 * 1024
+ACTIONS = {'pause': 'pause', 'resume': 'resume', 'poll': 'poll_now'}
+
+
+def describe(tenant, scheduler, full=False):
+    """Состояние подписки для ответа API, без токена."""
+    state = {
+        'key': tenant.key,
+        'chat_id': tenant.chat_id,
+        'from_date': tenant.from_date,
+        'status': tenant.status.name.lower() if tenant.status else None,
+        'changed_at': tenant.changed_at,
+        'next_poll': tenant.next_poll,
+        'paused': tenant.token in scheduler.paused,
+        'manual': scheduler.registry.is_manual(tenant.token),
+        'homeworks': len(tenant.statuses or {}),
+    }
+    if full:
+        state['statuses'] = {
+            key: status.name.lower()
+            for key, status in (tenant.statuses or {}).items()
+        }
+    return state
+
+
+def parse_tenant(data):
+    """Подписка из тела POST /tenants с проверкой типов полей."""
+    if not isinstance(data, dict):
+        raise TypeError('Ожидается объект JSON')
+    token, chat_id = data['token'], data['chat_id']
+    from_date = data.get('from_date')
+    if not isinstance(token, str) or not token:
+        raise TypeError('token должен быть непустой строкой')
+    if isinstance(chat_id, bool) or not isinstance(chat_id, (int, str)):
+        raise TypeError('chat_id должен быть числом или строкой')
+    if from_date is not None and (
+            isinstance(from_date, bool) or not isinstance(from_date, int)
+            or from_date < 0):
+        raise TypeError('from_date должен быть неотрицательным числом')
+    return Tenant(token, chat_id, from_date)
+
+
+class AdminHandler(BaseHTTPRequestHandler):
+    """Управление подписками работающего бота.
+    GET /tenants и GET /tenants/<key> - состояние подписок,
+    POST /tenants {"token", "chat_id", "from_date"} - новая подписка,
+    DELETE /tenants/<key> - снять подписку,
+    POST /tenants/<key>/pause|resume|poll - пауза, возобновление
+    и опрос вне расписания. Изменения выполняет поток планировщика.
+    owns(tenant) - принадлежит ли новая подписка этому воркеру.
+    """
+
+    scheduler = None
+    owns = None
+
+    def do_GET(self):
+        parts = self.path.strip('/').split('/')
+        if parts == ['tenants']:
+            self.reply(HTTPStatus.OK, [
+                describe(tenant, self.scheduler)
+                for tenant in self.scheduler.registry
+            ])
+            return
+        tenant = self.find(parts, 2)
+        if tenant is not None:
+            self.reply(
+                HTTPStatus.OK, describe(tenant, self.scheduler, full=True))
+
+    def do_POST(self):
+        parts = self.path.strip('/').split('/')
+        if parts == ['tenants']:
+            self.create()
+            return
+        if len(parts) == 3 and parts[2] not in ACTIONS:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        tenant = self.find(parts, 3)
+        if tenant is not None:
+            action = getattr(self.scheduler, ACTIONS[parts[2]])
+            self.scheduler.call_soon(action, tenant)
+            logger.info('Команда %s для %r', parts[2], tenant)
+            self.reply(HTTPStatus.ACCEPTED, {'key': tenant.key})
+
+    def do_DELETE(self):
+        tenant = self.find(self.path.strip('/').split('/'), 2)
+        if tenant is not None:
+            self.scheduler.call_soon(self.scheduler.remove, tenant)
+            logger.info('Подписка %r снята', tenant)
+            self.reply(HTTPStatus.ACCEPTED, {'key': tenant.key})
+
+    def create(self):
+        data = self.read_json()
+        if data is None:
+            return
+        try:
+            tenant = parse_tenant(data)
+        except (ValueError, TypeError, KeyError) as error:
+            self.send_error(HTTPStatus.BAD_REQUEST, explain=repr(error))
+            return
+        if self.owns is not None and not self.owns(tenant):
+            self.send_error(
+                HTTPStatus.MISDIRECTED_REQUEST,
+                explain='Подписка принадлежит другому воркеру')
+            return
+        if self.scheduler.registry.get(tenant.token) is not None:
+            self.send_error(HTTPStatus.CONFLICT)
+            return
+        self.scheduler.call_soon(self.scheduler.add, tenant, True)
+        logger.info('Подписка %r добавлена', tenant)
+        self.reply(HTTPStatus.CREATED, {'key': tenant.key})
+
+    def read_json(self):
+        """Тело запроса в JSON; при ошибке отвечает сам и вернёт None."""
+        length = self.headers.get('Content-Length')
+        if length is None:
+            self.send_error(HTTPStatus.LENGTH_REQUIRED)
+            return None
+        if not length.isdigit():
+            self.send_error(HTTPStatus.BAD_REQUEST)
+            return None
+        if int(length) > MAX_BODY_SIZE:
+            self.send_error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+            return None
+        try:
+            return json.loads(self.rfile.read(int(length)))
+        except ValueError as error:
+            self.send_error(HTTPStatus.BAD_REQUEST, explain=repr(error))
+            return None
+
+    def find(self, parts, size):
+        """Подписка по пути /tenants/<key>/...; иначе отвечает 404."""
+        tenant = None
+        if len(parts) == size and parts[0] == 'tenants':
+            tenant = self.scheduler.registry.by_key(parts[1])
+        if tenant is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+        return tenant
+
+    def reply(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        return str(self.client_address)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    """HTTP-сервер на Unix-сокете, доступном только владельцу."""
+
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        super().server_bind()
+        os.chmod(self.server_address, 0o600)
+
+
+def shard_address(address, index):
+    """Адрес API index-го локального воркера.
+    Порт сдвигается на index, к пути сокета добавляется номер.
+    """
+    host, _, port = address.rpartition(':')
+    if port.isdigit():
+        return f'{host}:{int(port) + index}' if host else int(port) + index
+    return f'{address}.{index}'
+
+
+def start_admin_server(address, scheduler, owns=None):
+    """Запускает API управления подписками в фоновом потоке.
+    address - порт, host:port или путь Unix-сокета; без хоста
+    сервер слушает только 127.0.0.1. owns(tenant) отсеивает
+    подписки, которые шардирование отдаёт другим воркерам.
+    """
+    handler = type('Handler', (AdminHandler,), {
+        'scheduler': scheduler, 'owns': staticmethod(owns)})
+    address = str(address)
+    host, _, port = address.rpartition(':')
+    if port.isdigit():
+        server = ThreadingHTTPServer((host or '127.0.0.1', int(port)), handler)
+    else:
+        server = UnixHTTPServer(address, handler)
+    threading.Thread(
+        target=server.serve_forever, name='admin', daemon=True).start()
+    logger.info('API управления на %s', server.server_address)
+    return server
@@ -0,0 +1,200 @@
+import asyncio
+import http.client
+import io
+import json
+import ssl
+import threading
+from urllib.parse import urlencode, urlsplit
+
+MAX_HEADER_LINES = 100
+
+
+class RequestError(OSError):
+    """Сбой соединения: запрос не дошёл или ответ не прочитан."""
+
+
+class Response:
+    """Ответ сервера целиком: код, заголовки и тело.
+    Повторяет нужную боту часть requests.Response.
+    """
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        """Разбирает JSON из тела ответа."""
+        return json.loads(self.content)
+
+    def close(self):
+        """Тело уже прочитано, закрывать нечего."""
+
+
+class AsyncHTTPClient:
+    """HTTP/1.1 клиент на asyncio streams с пулом keep-alive соединений.
+    Соединения к одному хосту переиспользуются, одновременно открыто
+    не больше pool_size. Разбирает ответы с Content-Length и chunked.
+    Все вызовы - из одного event loop.
+    """
+
+    def __init__(self, pool_size=10, timeout=30):
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(pool_size)
+        self._idle = {}
+        self._ssl = None
+        self.connections = 0
+
+    async def get(self, url, headers=None, params=None):
+        """GET-запрос, params добавляются в строку запроса."""
+        if params:
+            url = f'{url}?{urlencode(params)}'
+        return await self.request('GET', url, headers)
+
+    async def post_json(self, url, data, headers=None):
+        """POST-запрос с телом в JSON."""
+        headers = dict(headers or {})
+        headers['Content-Type'] = 'application/json'
+        return await self.request(
+            'POST', url, headers, json.dumps(data).encode())
+
+    async def request(self, method, url, headers=None, body=b''):
+        """Отправляет запрос и читает ответ не дольше timeout секунд.
+        Если сервер успел закрыть простаивавшее соединение,
+        запрос повторяется на новом.
+        """
+        parts = urlsplit(url)
+        secure = parts.scheme == 'https'
+        address = (parts.hostname, parts.port or (443 if secure else 80),
+                   secure)
+        target = parts.path or '/'
+        if parts.query:
+            target = f'{target}?{parts.query}'
+        lines = [f'{method} {target} HTTP/1.1', f'Host: {parts.netloc}',
+                 'Accept-Encoding: identity', 'Connection: keep-alive',
+                 f'Content-Length: {len(body)}']
+        lines += [
+            f'{name}: {value}' for name, value in (headers or {}).items()]
+        data = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+        async with self._slots:
+            try:
+                return await asyncio.wait_for(
+                    self._exchange(address, data, method), self.timeout)
+            except (OSError, EOFError, ValueError,
+                    asyncio.LimitOverrunError) as error:
+                raise RequestError(
+                    f'{method} {parts.netloc}{parts.path}: {error!r}'
+                ) from error
+
+    async def close(self):
+        """Закрывает простаивающие соединения."""
+        idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for _, writer in connections:
+                writer.close()
+
+    async def _exchange(self, address, data, method):
+        connection = self._take(address)
+        if connection is not None:
+            try:
+                return await self._send(address, connection, data, method)
+            except (ConnectionError, asyncio.IncompleteReadError) as error:
+                if getattr(error, 'partial', b''):
+                    raise
+        return await self._send(
+            address, await self._connect(address), data, method)
+
+    def _take(self, address):
+        connections = self._idle.get(address)
+        while connections:
+            reader, writer = connections.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer
+            writer.close()
+        return None
+
+    async def _connect(self, address):
+        host, port, secure = address
+        context = None
+        if secure:
+            if self._ssl is None:
+                self._ssl = ssl.create_default_context()
+            context = self._ssl
+        connection = await asyncio.open_connection(host, port, ssl=context)
+        self.connections += 1
+        return connection
+
+    async def _send(self, address, connection, data, method):
+        reader, writer = connection
+        try:
+            writer.write(data)
+            await writer.drain()
+            response, reusable = await self._read(reader, method)
+        except BaseException:
+            writer.close()
+            raise
+        if reusable:
+            self._idle.setdefault(address, []).append(connection)
+        else:
+            writer.close()
+        return response
+
+    async def _read(self, reader, method):
+        """Читает ответ. Возвращает его и можно ли дальше
+        использовать соединение.
+        """
+        status_line = await reader.readuntil(b'\r\n')
+        version, status = status_line.decode('latin-1').split()[:2]
+        raw = []
+        while True:
+            line = await reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            raw.append(line)
+            if len(raw) > MAX_HEADER_LINES:
+                raise ValueError('Слишком много заголовков в ответе')
+        headers = http.client.parse_headers(
+            io.BytesIO(b''.join(raw) + b'\r\n'))
+        status = int(status)
+        reusable = (
+            version == 'HTTP/1.1'
+            and headers.get('Connection', '').lower() != 'close')
+        if method == 'HEAD' or status in (204, 304) or status < 200:
+            content = b''
+        elif 'chunked' in headers.get('Transfer-Encoding', '').lower():
+            content = await self._read_chunked(reader)
+        elif headers.get('Content-Length') is not None:
+            content = await reader.readexactly(
+                int(headers['Content-Length']))
+        else:
+            content = await reader.read()
+            reusable = False
+        return Response(status, headers, content), reusable
+
+    async def _read_chunked(self, reader):
+        chunks = []
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            if size == 0:
+                while await reader.readuntil(b'\r\n') != b'\r\n':
+                    pass
+                return b''.join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+
+def start_event_loop():
+    """Event loop в фоновом потоке: в нём работают асинхронные клиенты,
+    а корутины ставятся из других потоков через run_coroutine_threadsafe.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(
+        target=loop.run_forever, name='event-loop', daemon=True).start()
+    return loop
+
+
+def stop_event_loop(loop, client=None):
+    """Закрывает соединения клиента и останавливает event loop."""
+    if client is not None:
+        asyncio.run_coroutine_threadsafe(client.close(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
@@ -0,0 +1,97 @@
+import re
+import threading
+import time
+
+from app_logger import get_logger
+
+logger = get_logger(__name__)
+
+PREFIX = 'Сбой в работе программы: '
+VOLATILE = re.compile(r'0x[0-9a-f]+|[0-9a-f]{8,}|\d+', re.IGNORECASE)
+
+
+def fingerprint(error):
+    """Отпечаток ошибки: тип и текст без чисел и идентификаторов."""
+    return f'{type(error).__name__}: {VOLATILE.sub("#", str(error))}'
+
+
+class Incident:
+    """Повторы одной ошибки в одном чате за текущее окно."""
+
+    __slots__ = ('message', 'since', 'repeats')
+
+    def __init__(self, message, since):
+        self.message = message
+        self.since = since
+        self.repeats = 0
+
+
+class ErrorDigest:
+    """Сообщения о сбоях без лавины повторов.
+    Первый сбой с новым отпечатком сообщается сразу, повторы
+    в течение window секунд только считаются. Когда окно
+    истекает, в чат уходит сводка о повторах и начинается новое
+    окно; окно без повторов закрывается.
+    """
+
+    def __init__(self, window=3600):
+        self.window = window
+        self._incidents = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def report(self, chat_id, error, now=None):
+        """Учитывает сбой. Возвращает текст, если о нём пора сообщить."""
+        now = time.time() if now is None else now
+        key = (chat_id, fingerprint(error))
+        with self._lock:
+            incident = self._incidents.get(key)
+            if incident is None:
+                self._incidents[key] = Incident(str(error), now)
+                return f'{PREFIX}{error}'
+            incident.message = str(error)
+            incident.repeats += 1
+        return None
+
+    def due(self, now=None):
+        """Закрывает истёкшие окна, возвращает сводки (chat_id, текст)."""
+        now = time.time() if now is None else now
+        digests = []
+        with self._lock:
+            for key, incident in list(self._incidents.items()):
+                if now - incident.since < self.window:
+                    continue
+                if not incident.repeats:
+                    del self._incidents[key]
+                    continue
+                digests.append((key[0], summary(incident)))
+                incident.since = now
+                incident.repeats = 0
+        return digests
+
+    def start(self, send, interval=60):
+        """Раз в interval секунд отдаёт сводки в send(chat_id, text)."""
+        def run():
+            while not self._stopping.wait(min(interval, self.window)):
+                for chat_id, text in self.due():
+                    send(chat_id, text)
+
+        self._thread = threading.Thread(
+            target=run, name='error-digest', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Останавливает поток сводок."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def summary(incident):
+    """Текст сводки о повторах сбоя."""
+    since = time.strftime('%d.%m %H:%M', time.localtime(incident.since))
+    return (
+        f'Сбой в работе программы повторился {incident.repeats} раз '
+        f'с {since}: {incident.message}')
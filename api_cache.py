@@ -0,0 +1,76 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+CURRENT_DATE = re.compile(rb'"current_date"\s*:\s*\d+')
+
+
+def body_digest(content):
+    """Хэш тела ответа без меняющегося при каждом запросе current_date."""
+    return hashlib.blake2b(
+        CURRENT_DATE.sub(b'', content), digest_size=16).digest()
+
+
+class CacheEntry:
+    """Валидаторы и хэш последнего ответа API для подписки."""
+
+    __slots__ = ('etag', 'last_modified', 'digest')
+
+    def __init__(self, etag, last_modified, digest):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+
+
+class ResponseCache:
+    """LRU-кэш последних ответов API по подпискам.
+    Хранит не тело ответа, а его хэш и заголовки для условного запроса,
+    поэтому неизменившийся ответ можно не разбирать вовсе.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def conditional_headers(self, key):
+        """Заголовки условного запроса для подписки."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def update(self, key, response):
+        """Запоминает ответ. Возвращает False, если он не изменился."""
+        digest = body_digest(response.content)
+        entry = CacheEntry(
+            response.headers.get('ETag'),
+            response.headers.get('Last-Modified'),
+            digest)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            self._entries[key] = entry
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return previous is None or previous.digest != digest
+
+    def touch(self, key):
+        """Отмечает использование записи (ответ 304)."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+
+    def forget(self, key):
+        """Сбрасывает запись, чтобы следующий ответ разобрался заново."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
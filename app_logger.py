@@ -1,19 +1,146 @@
+import atexit
+import json
 import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
 
 formatter = (
     '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+_listener = None
+_setup_lock = threading.Lock()
 
-def get_stream_handler():
+
+class JSONFormatter(logging.Formatter):
+    """Одна запись лога - одна строка JSON."""
+
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'name': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'sampled', 0):
+            data['sampled'] = record.sampled
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Прореживает повторяющиеся записи уровня INFO и ниже.
+    Из записей с одинаковым шаблоном сообщения за окно window
+    проходят первые burst, остальные считаются и отбрасываются.
+    Число отброшенных попадает в поле sampled следующей записи.
+    """
+
+    def __init__(self, burst, window):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > logging.INFO:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            started, passed, dropped = self._windows.get(key, (now, 0, 0))
+            if now - started >= self.window:
+                started, passed = now, 0
+            if passed >= self.burst:
+                self._windows[key] = (started, passed, dropped + 1)
+                return False
+            self._windows[key] = (started, passed + 1, 0)
+        record.sampled = dropped
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Не блокирует вызывающий поток.
+    Запись форматируется уже в потоке слушателя, а при
+    переполненной очереди отбрасывается.
+    """
+
+    dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def get_stream_handler(log_format='json'):
+    """Настройка хендлера."""
     stream_handler = logging.StreamHandler()
-    stream_handler.setLevel(logging.DEBUG)
-    stream_handler.setFormatter(logging.Formatter(formatter))
+    if log_format == 'json':
+        stream_handler.setFormatter(JSONFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(formatter))
     return stream_handler
 
 
+def setup_logging(level='INFO', log_format='json', queue_size=10000,
+                  sample_burst=10, sample_window=60):
+    """Один раз настраивает неблокирующий вывод логов.
+    Записи через очередь уходят в поток, который пишет их в поток
+    вывода. Повторные вызовы ничего не меняют. Дочерний процесс
+    после fork получает свою очередь и свой поток вывода.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+        log_queue = queue.Queue(queue_size)
+        handler = DroppingQueueHandler(log_queue)
+        handler.addFilter(SamplingFilter(sample_burst, sample_window))
+        root = logging.getLogger()
+        root.setLevel(level)
+        root.addHandler(handler)
+        _listener = QueueListener(log_queue, get_stream_handler(log_format))
+        _listener.start()
+        atexit.register(stop_logging)
+        os.register_at_fork(after_in_child=_restart_in_child)
+
+
+def _restart_in_child():
+    """Поток слушателя не переживает fork: заводит новые очередь и поток."""
+    global _listener
+    if _listener is None:
+        return
+    log_queue = queue.Queue(_listener.queue.maxsize)
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, DroppingQueueHandler):
+            handler.queue = log_queue
+    _listener = QueueListener(log_queue, *_listener.handlers)
+    _listener.start()
+
+
+def stop_logging():
+    """Выводит записи из очереди и останавливает поток слушателя.
+    Нужен в процессах, которые завершаются без atexit.
+    """
+    global _listener
+    with _setup_lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
 def get_logger(name):
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
-    logger.addHandler(get_stream_handler())
-    return logger
+    """Логгер модуля.
+    Обработчиков не добавляет: записи всплывают к корневому логгеру,
+    который настраивается один раз через setup_logging().
+    """
+    return logging.getLogger(name)
@@ -0,0 +1,96 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from app_logger import get_logger
+from notifier import TokenBucket
+
+logger = get_logger(__name__)
+
+
+def updated_at(homework):
+    """Время изменения домашки в секундах или None, если его нет.
+    API отдаёт date_updated строкой ISO 8601, тестовые серверы - числом.
+    """
+    value = homework.get('date_updated')
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return datetime.fromisoformat(
+            value.replace('Z', '+00:00')).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+
+class Backfill:
+    """Загрузка истории статусов для новых подписок.
+    Историю каждой подписки отдаёт fetch(tenant) потоком домашек.
+    Статусы записываются в подписку без уведомлений, курсор
+    встаёт на current_date, время изменения - на самое позднее
+    date_updated истории. Подписка без домашек получает пустой
+    словарь статусов: история загружена. Подписки обрабатываются по workers
+    за раз, запросы к API идут не чаще rate в секунду.
+    """
+
+    def __init__(self, fetch, parse, key, workers=3, rate=2):
+        self.fetch = fetch
+        self.parse = parse
+        self.key = key
+        self.workers = workers
+        self._bucket = TokenBucket(rate, 1)
+        self._lock = threading.Lock()
+
+    def _throttle(self):
+        while True:
+            with self._lock:
+                delay = self._bucket.wait_time(time.monotonic())
+                if not delay:
+                    self._bucket.take()
+                    return
+            time.sleep(delay)
+
+    def seed(self, tenant):
+        """Загружает историю одной подписки."""
+        self._throttle()
+        stream = self.fetch(tenant)
+        statuses = {}
+        changed_at = None
+        for homework in stream:
+            try:
+                homework_name, status = self.parse(homework)
+            except ValueError as error:
+                logger.warning('Пропущена домашка %r: %s', tenant, error)
+                continue
+            statuses[self.key(homework)] = status
+            updated = updated_at(homework)
+            if updated is not None:
+                changed_at = max(updated, changed_at or updated)
+        if changed_at is None:
+            changed_at = tenant.changed_at
+        if statuses:
+            tenant.update_statuses(statuses)
+        elif tenant.statuses is None:
+            tenant.statuses = {}
+        tenant.changed_at = changed_at
+        tenant.from_date = stream.current_date
+        return len(statuses)
+
+    def run(self, tenants, store):
+        """Загружает историю подписок и сохраняет её в хранилище."""
+        seeded = 0
+
+        def seed(tenant):
+            try:
+                count = self.seed(tenant)
+            except Exception:
+                logger.exception('Не удалось загрузить историю %r', tenant)
+                return False
+            store.save(tenant)
+            logger.info('История %r: домашек %s', tenant, count)
+            return True
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            seeded = sum(executor.map(seed, tenants))
+        store.flush()
+        return seeded
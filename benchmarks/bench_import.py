@@ -0,0 +1,53 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ('telegram', 'requests', 'asyncio', 'multiprocessing')
+PROBE = f'''
+import sys, time
+started = time.perf_counter()
+import homework
+elapsed = time.perf_counter() - started
+loaded = [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+print(elapsed, ','.join(loaded))
+'''
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Время импорта homework в чистом интерпретаторе.')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget', type=float, default=0,
+                        help='допустимая медиана в мс, 0 - без проверки')
+    return parser.parse_args()
+
+
+def measure():
+    """Один импорт в новом процессе: секунды и загруженные тяжёлые модули."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE],
+        cwd=root, capture_output=True, text=True, check=True).stdout
+    elapsed, loaded = output.split(' ')
+    return float(elapsed), loaded.strip()
+
+
+def main():
+    args = parse_args()
+    results = [measure() for _ in range(args.runs)]
+    timings = [elapsed * 1000 for elapsed, _ in results]
+    median = statistics.median(timings)
+    print(f'runs:               {args.runs}')
+    print(f'median:             {median:.1f} ms')
+    print(f'min/max:            {min(timings):.1f}/{max(timings):.1f} ms')
+    print(f'heavy modules:      {results[0][1] or "-"}')
+    if args.budget and median > args.budget:
+        print(f'over budget:        {args.budget} ms')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
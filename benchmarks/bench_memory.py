@@ -0,0 +1,53 @@
+import argparse
+import sys
+import tracemalloc
+
+from tenants import Status, Tenant
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Память под состояние подписок.')
+    parser.add_argument('--tenants', type=int, default=100000)
+    parser.add_argument('--homeworks', type=int, default=3,
+                        help='домашек с известным статусом у подписки')
+    parser.add_argument('--budget', type=int, default=0,
+                        help='допустимо байт на подписку, 0 - без проверки')
+    return parser.parse_args()
+
+
+def build(count, homeworks):
+    """Подписки с заполненными статусами домашек."""
+    tenants = []
+    for index in range(count):
+        tenant = Tenant(f'token-{index}', index)
+        if homeworks:
+            tenant.update_statuses({
+                str(number): Status(number % len(Status) + 1)
+                for number in range(homeworks)
+            })
+        tenants.append(tenant)
+    return tenants
+
+
+def main():
+    args = parse_args()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tenants = build(args.tenants, args.homeworks)
+    after = tracemalloc.take_snapshot()
+    total = sum(
+        stat.size_diff for stat in after.compare_to(before, 'filename'))
+    per_tenant = total / len(tenants)
+    print(f'tenants:            {len(tenants)}')
+    print(f'homeworks/tenant:   {args.homeworks}')
+    print(f'total:              {total / 1024 / 1024:.1f} MB')
+    print(f'per tenant:         {per_tenant:.0f} B')
+    if args.budget and per_tenant > args.budget:
+        print(f'over budget:        {args.budget} B')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
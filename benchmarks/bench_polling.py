@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import random
+import resource
+import statistics
+import sys
+import threading
+import time
+
+from benchmarks.fake_servers import (
+    FakeWorld, PracticumHandler, TelegramHandler, serve)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Нагрузочный прогон бота на подставных серверах.')
+    parser.add_argument('--tenants', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--interval', type=float, default=1)
+    parser.add_argument('--workers', type=int, default=10)
+    parser.add_argument('--change-rate', type=float, default=5,
+                        help='изменений статусов в секунду')
+    parser.add_argument('--latency', type=float, default=0.01)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--telegram-latency', type=float, default=0.01)
+    parser.add_argument('--telegram-error-rate', type=float, default=0)
+    parser.add_argument('--mode', choices=('threads', 'async'),
+                        default='threads', help='режим EXECUTION_MODE')
+    parser.add_argument('--drain-timeout', type=float, default=10,
+                        help='сколько ждать досылки очереди после прогона')
+    return parser.parse_args()
+
+
+def percentile(values, share):
+    """Перцентиль по отсортированной выборке."""
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def rss_mb():
+    """Пиковый RSS процесса в мегабайтах."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def mutate(world, tokens, rate, stop):
+    """Меняет статусы случайных домашек с заданной частотой."""
+    while not stop.is_set():
+        world.change_status(random.choice(tokens))
+        stop.wait(1 / rate)
+
+
+def main():
+    args = parse_args()
+    chats = {f'token-{index}': index for index in range(args.tenants)}
+    world = FakeWorld(
+        chats, args.latency, args.error_rate,
+        args.telegram_latency, args.telegram_error_rate)
+    _, practicum_url = serve(PracticumHandler, world)
+    _, telegram_url = serve(TelegramHandler, world)
+
+    import homework
+    from aio_http import stop_event_loop
+    from scheduler import Scheduler
+    from tenants import Tenant, TenantRegistry
+
+    homework.ENDPOINT = f'{practicum_url}/homework_statuses/'
+    homework.TELEGRAM_TOKEN = '1234:benchmark'
+    homework.TELEGRAM_API_URL = f'{telegram_url}/bot'
+    homework.EXECUTION_MODE = args.mode
+    homework.POLL_WORKERS = homework.SEND_WORKERS = args.workers
+    rss_before = rss_mb()
+    registry = TenantRegistry()
+    for token, chat_id in chats.items():
+        registry.add(Tenant(token, chat_id))
+    session, bot, loop = homework.get_clients()
+    notifier = homework.get_notifier(bot).start()
+    cache = homework.ResponseCache(args.tenants)
+    poll = homework.async_poll_tenant if loop else homework.poll_tenant
+    scheduler = Scheduler(
+        registry,
+        lambda tenant: poll(notifier, tenant, session, cache),
+        args.interval,
+        args.workers,
+        queue_size=args.workers)
+    if loop is None:
+        run = scheduler.run_forever
+    else:
+        def run():
+            asyncio.run_coroutine_threadsafe(
+                scheduler.run_async(), loop).result()
+
+    stop = threading.Event()
+    threading.Thread(
+        target=mutate, args=(world, list(chats), args.change_rate, stop),
+        daemon=True).start()
+    polling = threading.Thread(target=run, daemon=True)
+    polling.start()
+    started = time.time()
+    time.sleep(args.duration)
+    stop.set()
+    scheduler.stop()
+    polling.join()
+    drained = notifier.drain(args.drain_timeout)
+    notifier.stop()
+    if loop is not None:
+        stop_event_loop(loop, session)
+    elapsed = time.time() - started
+    delivery = list(world.delivery)
+
+    print(f'tenants:            {args.tenants}')
+    print(f'polls/s:            {world.polls / elapsed:.1f}')
+    print(f'sends/s:            {world.sends / elapsed:.1f}')
+    print(f'notifications:      {len(delivery)}')
+    if not drained:
+        print(f'not drained:        {len(notifier)}')
+    for share in (0.5, 0.9, 0.99):
+        print(f'latency p{int(share * 100):<2}:        '
+              f'{percentile(delivery, share):.3f} s')
+    if delivery:
+        print(f'latency mean:       {statistics.mean(delivery):.3f} s')
+    print(f'rss peak:           {rss_mb():.1f} MB '
+          f'(+{rss_mb() - rss_before:.1f} MB for the bot)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+STATUSES = ('reviewing', 'approved', 'rejected')
+
+
+class FakeWorld:
+    """Общее состояние подставных Практикума и Telegram.
+    Хранит домашки по токенам, время их изменения и задержки
+    доставки уведомлений.
+    """
+
+    def __init__(self, chats, latency=0, error_rate=0,
+                 telegram_latency=0, telegram_error_rate=0):
+        self.chats = chats
+        self.latency = latency
+        self.error_rate = error_rate
+        self.telegram_latency = telegram_latency
+        self.telegram_error_rate = telegram_error_rate
+        self.homeworks = {token: [] for token in chats}
+        self.changed = {}
+        self.delivery = []
+        self.polls = 0
+        self.sends = 0
+        self._lock = threading.Lock()
+
+    def change_status(self, token):
+        """Меняет статус домашки токена, как это сделал бы ревьюер."""
+        now = time.time()
+        with self._lock:
+            homeworks = self.homeworks[token]
+            if not homeworks or random.random() < 0.2:
+                homework = {
+                    'id': len(homeworks) + 1,
+                    'homework_name': f'hw{len(homeworks) + 1}',
+                }
+                homeworks.append(homework)
+            else:
+                homework = random.choice(homeworks)
+            homework['status'] = random.choice(STATUSES)
+            homework['date_updated'] = int(now)
+            self.changed.setdefault(str(self.chats[token]), now)
+
+    def answer(self, token, from_date):
+        """Ответ эндпоинта homework_statuses."""
+        with self._lock:
+            self.polls += 1
+            homeworks = [
+                dict(homework) for homework in self.homeworks.get(token, ())
+                if homework['date_updated'] >= from_date
+            ]
+        return {'homeworks': homeworks, 'current_date': int(time.time())}
+
+    def delivered(self, chat_id):
+        """Учитывает доставленное уведомление."""
+        now = time.time()
+        with self._lock:
+            self.sends += 1
+            changed = self.changed.pop(str(chat_id), None)
+            if changed is not None:
+                self.delivery.append(now - changed)
+
+
+class JSONHandler(BaseHTTPRequestHandler):
+    """Общая часть подставных серверов."""
+
+    world = None
+    protocol_version = 'HTTP/1.1'
+
+    def reply(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PracticumHandler(JSONHandler):
+    """Подставной эндпоинт homework_statuses."""
+
+    def do_GET(self):
+        time.sleep(self.world.latency)
+        if random.random() < self.world.error_rate:
+            self.reply(500, {'message': 'fake error'})
+            return
+        authorization = self.headers.get('Authorization', '')
+        token = authorization.partition('OAuth ')[2]
+        query = parse_qs(urlparse(self.path).query)
+        from_date = int(float(query.get('from_date', ['0'])[0]))
+        self.reply(200, self.world.answer(token, from_date))
+
+
+class TelegramHandler(JSONHandler):
+    """Подставной метод sendMessage Bot API."""
+
+    def do_POST(self):
+        time.sleep(self.world.telegram_latency)
+        length = int(self.headers.get('Content-Length', 0))
+        data = json.loads(self.rfile.read(length) or b'{}')
+        if random.random() < self.world.telegram_error_rate:
+            self.reply(502, {'ok': False, 'description': 'fake error'})
+            return
+        chat_id = data.get('chat_id')
+        self.world.delivered(chat_id)
+        self.reply(200, {'ok': True, 'result': {
+            'message_id': self.world.sends,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'text': data.get('text'),
+        }})
+
+
+def serve(handler, world):
+    """Запускает подставной сервер на свободном порту."""
+    handler = type(handler.__name__, (handler,), {'world': world})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
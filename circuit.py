@@ -0,0 +1,143 @@
+import threading
+import time
+from http import HTTPStatus
+
+from app_logger import get_logger
+
+logger = get_logger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitBreaker:
+    """Предохранитель для вызовов к внешнему сервису.
+    После threshold сбоев подряд размыкается на delay секунд,
+    затем пропускает одну пробную попытку (half-open). Неудачная
+    проба размыкает его снова на вдвое больший срок, до max_delay.
+    Если исход пробы не пришёл за delay секунд, пропускается новая.
+    """
+
+    def __init__(self, name, threshold=5, delay=30, max_delay=1800):
+        self.name = name
+        self.threshold = threshold
+        self.delay = delay
+        self.max_delay = max_delay
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.reopen_at = 0
+        self.probe_at = 0
+        self._cooldown = delay
+        self._lock = threading.Lock()
+
+    def allow(self, now=None):
+        """Можно ли сейчас обращаться к сервису."""
+        now = now or time.monotonic()
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and now >= self.reopen_at:
+                self.state = HALF_OPEN
+                self.probe_at = now
+                return True
+            if self.state == HALF_OPEN and now >= self.probe_at + self.delay:
+                logger.warning('Проба сервиса %s потерялась', self.name)
+                self.probe_at = now
+                return True
+            return False
+
+    def retry_in(self, now=None):
+        """Через сколько секунд стоит попробовать снова."""
+        now = now or time.monotonic()
+        with self._lock:
+            if self.state == OPEN:
+                return max(0, self.reopen_at - now)
+            if self.state == HALF_OPEN:
+                return max(0, self.probe_at + self.delay - now)
+            return 0
+
+    def record_success(self):
+        """Учитывает удачный вызов: предохранитель замыкается."""
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info('Сервис %s снова доступен', self.name)
+            self.state = CLOSED
+            self.failures = 0
+            self._cooldown = self.delay
+
+    def record_failure(self, now=None):
+        """Учитывает сбой вызова."""
+        now = now or time.monotonic()
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                self._cooldown = min(self._cooldown * 2, self.max_delay)
+            elif self.failures < self.threshold or self.state == OPEN:
+                return
+            self.state = OPEN
+            self.reopen_at = now + self._cooldown
+            logger.warning(
+                'Сервис %s недоступен, пауза %s с', self.name, self._cooldown)
+
+
+def is_upstream_failure(error):
+    """Сбой самого сервиса, а не конкретного токена."""
+    status_code = getattr(error, 'status_code', None)
+    if status_code is None:
+        return True
+    return (
+        status_code >= HTTPStatus.INTERNAL_SERVER_ERROR
+        or status_code == HTTPStatus.TOO_MANY_REQUESTS)
+
+
+class CircuitBreakers:
+    """Общий предохранитель эндпоинта и предохранители подписок.
+    Предохранитель эндпоинта один на все подписки, поэтому при сбое
+    API все опросы отступают разом. Предохранители подписок заводятся
+    только для сбоящих токенов и удаляются после удачного опроса.
+    """
+
+    def __init__(self, endpoint, threshold=5, delay=30, max_delay=1800):
+        self.settings = (threshold, delay, max_delay)
+        self.endpoint = CircuitBreaker(endpoint, *self.settings)
+        self._tenants = {}
+        self._lock = threading.Lock()
+
+    def allow(self, tenant):
+        """Можно ли сейчас опрашивать подписку.
+        Сначала спрашивается эндпоинт: отказ общего предохранителя
+        не должен расходовать пробу предохранителя подписки.
+        """
+        if not self.endpoint.allow():
+            return False
+        breaker = self._tenants.get(tenant.key)
+        return breaker is None or breaker.allow()
+
+    def retry_in(self, tenant):
+        """Минимальная пауза до следующего опроса подписки."""
+        breaker = self._tenants.get(tenant.key)
+        tenant_delay = breaker.retry_in() if breaker is not None else 0
+        return max(tenant_delay, self.endpoint.retry_in())
+
+    def record_success(self, tenant):
+        """Учитывает удачный опрос подписки."""
+        self.endpoint.record_success()
+        with self._lock:
+            self._tenants.pop(tenant.key, None)
+
+    def record_failure(self, tenant, error):
+        """Учитывает сбой: общий - эндпоинту, иначе подписке.
+        Ответ с ошибкой токена значит, что эндпоинт жив.
+        """
+        if is_upstream_failure(error):
+            self.endpoint.record_failure()
+            return
+        self.endpoint.record_success()
+        with self._lock:
+            breaker = self._tenants.get(tenant.key)
+            if breaker is None:
+                breaker = CircuitBreaker(repr(tenant), *self.settings)
+                self._tenants[tenant.key] = breaker
+        breaker.record_failure()
@@ -7,6 +7,12 @@ class ErrorSendingMessage(Exception):
 
 
 class ResponseStatusCodeNoneOk(Exception):
+    def __init__(self, message='', status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitOpen(Exception):
     pass
 
 
@@ -1,16 +1,33 @@
+import argparse
 import logging
-
 import os
+import signal
 import sys
+import threading
 
-import requests
 import time
-import telegram
 from dotenv import load_dotenv
 from exceptions import (
+    CircuitOpen,
     ErrorSendingMessage,
     ResponseStatusCodeNoneOk)
 from http import HTTPStatus
+from admin import shard_address, start_admin_server
+from alerts import ErrorDigest
+from api_cache import ResponseCache
+from backfill import Backfill
+from app_logger import setup_logging, stop_logging
+from circuit import CircuitBreakers
+from metrics import REGISTRY, start_metrics_server, timed
+from notifier import SendQueue
+from scheduler import TICK, AdaptiveInterval, Scheduler
+from sharding import HashRing, owned_tenants
+from storage import get_outbox_store, get_state_store
+from streaming import HomeworkStream
+from templates import TemplateRegistry
+from tenants import Status, load_tenants
+from tracing import SamplingProfiler, start_tracing, stop_tracing, traced
+from webhook import start_webhook_server
 
 load_dotenv()
 
@@ -18,11 +35,50 @@ load_dotenv()
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+TENANTS_FILE = os.getenv('TENANTS_FILE')
+STATE_DB = os.getenv('STATE_DB')
 
 
 RETRY_TIME = 600
-ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
-HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+POLL_MIN_INTERVAL = int(os.getenv('POLL_MIN_INTERVAL', 120))
+POLL_MAX_INTERVAL = int(os.getenv('POLL_MAX_INTERVAL', 3600))
+POLL_WORKERS = int(os.getenv('POLL_WORKERS', 10))
+POLL_BATCH_WINDOW = float(os.getenv('POLL_BATCH_WINDOW', 5))
+POLL_QUEUE_SIZE = int(os.getenv('POLL_QUEUE_SIZE', POLL_WORKERS))
+SEND_WORKERS = int(os.getenv('SEND_WORKERS', 4))
+EXECUTION_MODE = os.getenv('EXECUTION_MODE', 'threads')
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 30))
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 10000))
+METRICS_PORT = os.getenv('METRICS_PORT')
+REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', 30))
+STREAM_CHUNK_SIZE = 64 * 1024
+BACKFILL_WORKERS = int(os.getenv('BACKFILL_WORKERS', 3))
+BACKFILL_RATE = float(os.getenv('BACKFILL_RATE', 2))
+BREAKER_THRESHOLD = int(os.getenv('BREAKER_THRESHOLD', 5))
+BREAKER_DELAY = int(os.getenv('BREAKER_DELAY', 30))
+BREAKER_MAX_DELAY = int(os.getenv('BREAKER_MAX_DELAY', 1800))
+INGESTION_MODE = os.getenv('INGESTION_MODE', 'poll')
+WEBHOOK_PORT = os.getenv('WEBHOOK_PORT')
+ADMIN_ADDRESS = os.getenv('ADMIN_ADDRESS')
+SHARD_NODES = os.getenv('SHARD_NODES')
+SHARD_ID = os.getenv('SHARD_ID', os.getenv('DYNO'))
+SHARD_PROCESSES = int(os.getenv('SHARD_PROCESSES', 1))
+ENDPOINT = os.getenv(
+    'PRACTICUM_ENDPOINT',
+    'https://practicum.yandex.ru/api/user_api/homework_statuses/')
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL')
+TELEGRAM_BOT_API = 'https://api.telegram.org/bot'
+OUTBOX_RETENTION = float(os.getenv('OUTBOX_RETENTION', 7 * 24 * 3600))
+ERROR_WINDOW = float(os.getenv('ERROR_WINDOW', 3600))
+SHUTDOWN_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', 20))
+TRACE_FILE = os.getenv('TRACE_FILE')
+PROFILE_FILE = os.getenv('PROFILE_FILE')
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', 0.005))
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+LOG_SAMPLE_BURST = int(os.getenv('LOG_SAMPLE_BURST', 10))
+LOG_SAMPLE_WINDOW = float(os.getenv('LOG_SAMPLE_WINDOW', 60))
 
 
 HOMEWORK_VERDICTS = {
@@ -30,44 +86,68 @@ HOMEWORK_VERDICTS = {
     'reviewing': 'Работа взята на проверку ревьюером.',
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
+VERDICTS_BY_CODE = {
+    Status.parse(status): verdict
+    for status, verdict in HOMEWORK_VERDICTS.items()
+}
+TEMPLATES = TemplateRegistry(VERDICTS_BY_CODE)
+ALERTS = ErrorDigest(ERROR_WINDOW)
+
 
+setup_logging(
+    LOG_LEVEL,
+    LOG_FORMAT,
+    sample_burst=LOG_SAMPLE_BURST,
+    sample_window=LOG_SAMPLE_WINDOW)
+logger = logging.getLogger(__name__)
 
-formatter = (
-    '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 
+def get_headers(token):
+    """Заголовки запроса к API от имени владельца токена."""
+    return {'Authorization': f'OAuth {token}'}
 
-def get_stream_handler():
-    """Настройка хендлера."""
-    stream_handler = logging.StreamHandler()
-    stream_handler.setLevel(logging.DEBUG)
-    stream_handler.setFormatter(logging.Formatter(formatter))
-    return stream_handler
 
+def get_session(pool_size=POLL_WORKERS):
+    """Общая HTTP-сессия с пулом keep-alive соединений."""
+    import requests
 
-def get_logger(name):
-    """Настройка логирования."""
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
-    logger.addHandler(get_stream_handler())
-    return logger
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=1, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
 
 
-logger = get_logger(__name__)
+def get_bot(pool_size=SEND_WORKERS):
+    """Бот Telegram с пулом соединений под параллельные отправки."""
+    import telegram
+
+    request = telegram.utils.request.Request(con_pool_size=pool_size + 4)
+    return telegram.Bot(
+        token=TELEGRAM_TOKEN, base_url=TELEGRAM_API_URL, request=request)
 
 
 def send_message(bot, message_tg):
     """Отправляет сообщение в Telegram чат."""
+    send_chat_message(bot, TELEGRAM_CHAT_ID, message_tg)
+
+
+@timed('send_message')
+def send_chat_message(bot, chat_id, message_tg):
+    """Отправляет сообщение в указанный Telegram чат."""
+    import telegram
+
     try:
         logger.info('Начали отправку сообщения')
         bot.send_message(
-            chat_id=TELEGRAM_CHAT_ID,
+            chat_id=chat_id,
             text=message_tg
         )
-    except ErrorSendingMessage:
-        message_error = 'Не удалось отправить сообщение'
-        logger.error(message_error)
-        raise ErrorSendingMessage(message_error)
+    except telegram.error.TelegramError as error:
+        logger.error('Не удалось отправить сообщение: %s', error)
+        raise ErrorSendingMessage(
+            f'Не удалось отправить сообщение: {error}') from error
     else:
         logger.info('Удачная отправка сообщения')
 
@@ -78,40 +158,229 @@ def get_api_answer(current_timestamp):
     В случае успешного запроса должна вернуть ответ API.
     Преобразовав из JSON в Python.
     """
+    return get_tenant_answer(PRACTICUM_TOKEN, current_timestamp)
+
+
+def get_tenant_answer(token, current_timestamp, session=None):
+    """Делает запрос эндпоинту API-сервиса от имени владельца токена.
+    session - общая сессия с пулом соединений, по умолчанию requests.
+    """
+    response = request_api(session, get_headers(token), current_timestamp)
+    check_status_code(response)
+    return decode_json(response)
+
+
+@traced('decode_json')
+def decode_json(response):
+    """Разбирает JSON из тела ответа."""
+    return response.json()
+
+
+@timed('get_api_answer')
+def request_api(session, headers, current_timestamp, stream=False):
+    """Отправляет запрос к API, возвращает ответ без разбора."""
+    if session is None:
+        import requests
+
+        session = requests
+    logger.info('Начали запрос к API')
+    if current_timestamp is None:
+        current_timestamp = int(time.time())
+    params = {'from_date': current_timestamp}
+    return session.get(
+        ENDPOINT, headers=headers, params=params, timeout=REQUEST_TIMEOUT,
+        stream=stream)
+
+
+def check_status_code(response):
+    """Проверяет код ответа API."""
+    if response.status_code != HTTPStatus.OK:
+        message_error = f'Код ответа {response.status_code}'
+        raise ResponseStatusCodeNoneOk(message_error, response.status_code)
+
+
+def get_guarded_answer(tenant, session=None, cache=None, breakers=None):
+    """Запрос к API за предохранителями эндпоинта и подписки."""
+    if breakers is None:
+        return get_cached_answer(tenant, session, cache)
+    if not breakers.allow(tenant):
+        raise CircuitOpen(f'Опрос {tenant!r} отложен предохранителем')
+    import requests
+
     try:
-        logger.info('Начали запрос к API')
-        timestamp = current_timestamp or int(time.time())
-        params = {'from_date': timestamp}
-        response = requests.get(ENDPOINT, headers=HEADERS, params=params)
-        if response.status_code != HTTPStatus.OK:
-            raise ResponseStatusCodeNoneOk
-        return response.json()
+        response = get_cached_answer(tenant, session, cache)
+    except (requests.RequestException, ResponseStatusCodeNoneOk) as error:
+        breakers.record_failure(tenant, error)
+        raise
+    breakers.record_success(tenant)
+    return response
+
+
+def get_api_stream(token, current_timestamp, session=None):
+    """Запрос к API с потоковым разбором ответа.
+    Для больших историй: домашки читаются и проверяются по одной.
+    """
+    response = request_api(
+        session, get_headers(token), current_timestamp, stream=True)
+    try:
+        check_status_code(response)
     except ResponseStatusCodeNoneOk:
-        message_error = f'Код ответа {response.status_code}'
-        raise ResponseStatusCodeNoneOk(message_error)
+        response.close()
+        raise
+    return HomeworkStream(
+        response.iter_content(STREAM_CHUNK_SIZE), close=response.close)
+
+
+def get_cached_answer(tenant, session=None, cache=None):
+    """Запрос к API для подписки с условными заголовками и кэшем.
+    Возвращает None, если ответ не изменился с прошлого опроса:
+    тогда проверять и разбирать его не нужно. Полная история
+    (from_date = 0) читается потоком, мимо кэша.
+    """
+    if tenant.from_date == 0:
+        return get_api_stream(tenant.token, 0, session)
+    if cache is None:
+        return get_tenant_answer(tenant.token, tenant.from_date, session)
+    headers = get_headers(tenant.token)
+    headers.update(cache.conditional_headers(tenant.key))
+    response = request_api(session, headers, tenant.from_date)
+    if response.status_code == HTTPStatus.NOT_MODIFIED:
+        cache.touch(tenant.key)
+        return None
+    check_status_code(response)
+    if not cache.update(tenant.key, response):
+        return None
+    return decode_json(response)
+
+
+@timed('get_api_answer')
+async def async_request_api(client, headers, current_timestamp):
+    """Асинхронный запрос к API, ответ без разбора."""
+    logger.info('Начали запрос к API')
+    if current_timestamp is None:
+        current_timestamp = int(time.time())
+    return await client.get(
+        ENDPOINT, headers=headers, params={'from_date': current_timestamp})
 
 
+async def async_get_api_answer(client, token, current_timestamp):
+    """Асинхронный запрос к API через общий пул соединений client."""
+    response = await async_request_api(
+        client, get_headers(token), current_timestamp)
+    check_status_code(response)
+    return decode_json(response)
+
+
+async def async_get_cached_answer(tenant, client, cache=None):
+    """То же, что get_cached_answer, на асинхронном клиенте.
+    Ответ читается целиком, полная история тоже.
+    """
+    if cache is None or tenant.from_date == 0:
+        return await async_get_api_answer(
+            client, tenant.token, tenant.from_date)
+    headers = get_headers(tenant.token)
+    headers.update(cache.conditional_headers(tenant.key))
+    response = await async_request_api(client, headers, tenant.from_date)
+    if response.status_code == HTTPStatus.NOT_MODIFIED:
+        cache.touch(tenant.key)
+        return None
+    check_status_code(response)
+    if not cache.update(tenant.key, response):
+        return None
+    return decode_json(response)
+
+
+async def async_get_guarded_answer(tenant, client, cache=None,
+                                   breakers=None):
+    """Асинхронный запрос к API за предохранителями."""
+    from aio_http import RequestError
+
+    if breakers is not None and not breakers.allow(tenant):
+        raise CircuitOpen(f'Опрос {tenant!r} отложен предохранителем')
+    try:
+        response = await async_get_cached_answer(tenant, client, cache)
+    except (RequestError, ResponseStatusCodeNoneOk) as error:
+        if breakers is not None:
+            breakers.record_failure(tenant, error)
+        raise
+    if breakers is not None:
+        breakers.record_success(tenant)
+    return response
+
+
+async def async_send_message(client, chat_id, message_tg):
+    """Асинхронно отправляет сообщение методом sendMessage Bot API.
+    Ошибки - те же исключения telegram.error, что у telegram.Bot.
+    """
+    import telegram.error
+
+    from aio_http import RequestError
+
+    url = f'{TELEGRAM_API_URL or TELEGRAM_BOT_API}{TELEGRAM_TOKEN}'
+    try:
+        response = await client.post_json(
+            f'{url}/sendMessage', {'chat_id': chat_id, 'text': message_tg})
+    except RequestError as error:
+        raise telegram.error.NetworkError(str(error)) from error
+    check_telegram_answer(response)
+
+
+def check_telegram_answer(response):
+    """Превращает ответ Bot API с ошибкой в исключение telegram.error."""
+    import telegram.error
+
+    try:
+        data = response.json()
+    except ValueError:
+        data = {}
+    if response.status_code == HTTPStatus.OK and data.get('ok'):
+        return
+    description = data.get('description', f'Код ответа {response.status_code}')
+    retry_after = (data.get('parameters') or {}).get('retry_after')
+    if retry_after is not None:
+        raise telegram.error.RetryAfter(retry_after)
+    if response.status_code == HTTPStatus.BAD_REQUEST:
+        raise telegram.error.BadRequest(description)
+    if response.status_code in (
+            HTTPStatus.UNAUTHORIZED, HTTPStatus.FORBIDDEN,
+            HTTPStatus.NOT_FOUND):
+        raise telegram.error.Unauthorized(description)
+    raise telegram.error.NetworkError(description)
+
+
+@timed('check_response')
 def check_response(response):
     """Проверяет ответ API на корректность."""
     if not isinstance(response, dict):
         raise TypeError(
             'Ответ от API. Тип не словарь.'
-            f' response = {response}.')
+            f' Получен {type(response).__name__}.')
     homeworks = response.get('homeworks')
     if 'homeworks' not in response or 'current_date' not in response:
         raise KeyError(
             'В ответе от API присутствуют ключ(и) '
             '"homeworks" и/или "current_date".'
-            f' response = {response}.')
+            f' Ключи ответа: {sorted(response)}.')
     if not isinstance(homeworks, list):
         raise TypeError(
             'В ответе от API под ключом "homeworks" пришел не список.'
-            f' response = {response}.')
+            f' Получен {type(homeworks).__name__}.')
     return homeworks
 
 
 def parse_status(homework):
     """Извлекает из информации о конкретной домашке статус работы."""
+    homework_name, status = parse_verdict(homework)
+    return TEMPLATES.render(homework_name, status, TEMPLATES.default_locale)
+
+
+@timed('parse_status')
+def parse_verdict(homework):
+    """Проверяет домашку, возвращает её название и код статуса."""
+    if not isinstance(homework, dict):
+        raise TypeError(
+            f'Домашка в ответе API - {type(homework).__name__}, '
+            'а не словарь.')
     homework_name = homework.get('homework_name')
     homework_status = homework.get('status')
     if 'homework_name' not in homework:
@@ -120,45 +389,530 @@ def parse_status(homework):
     if homework_status not in HOMEWORK_VERDICTS:
         message_error = 'Недокумнтированный "status" в ответе'
         raise ValueError(message_error)
-    verdict = HOMEWORK_VERDICTS[homework_status]
-    return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+    return homework_name, Status.parse(homework_status)
+
+
+@traced('render_notice')
+def render_notice(chat_id, notice):
+    """Текст уведомления: строится только при отправке.
+    notice - готовый текст или (название домашки, код статуса,
+    ключ подписки, ключ журнала); язык берётся из настроек чата.
+    """
+    if isinstance(notice, str):
+        return notice
+    homework_name, status, tenant_key, _ = notice
+    return TEMPLATES.render(
+        homework_name, Status(status), TEMPLATES.locale_for(chat_id),
+        tenant_key)
+
+
+def outbox_key(notice):
+    """Ключ журнала уведомления; у текстов о сбоях его нет."""
+    if isinstance(notice, str):
+        return None
+    return notice[3]
+
+
+def notice_tenant(notice):
+    """Ключ подписки уведомления; у текстов о сбоях его нет."""
+    if isinstance(notice, str):
+        return None
+    return notice[2]
 
 
 def check_tokens():
     """Проверяет доступность переменных окружения."""
-    return all((PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID))
+    single_tenant = PRACTICUM_TOKEN and TELEGRAM_CHAT_ID
+    return bool(TELEGRAM_TOKEN and (TENANTS_FILE or single_tenant))
+
+
+def homework_key(homework):
+    """Ключ домашней работы для сравнения статусов."""
+    return str(homework.get('id', homework.get('homework_name')))
+
+
+def process_response(tenant, response):
+    """Сравнивает статусы всех домашек ответа с запомненными."""
+    return diff_homeworks(tenant, check_response(response))
+
+
+def diff_homeworks(tenant, homeworks):
+    """Сравнивает статусы домашек с запомненными.
+    Возвращает изменения {ключ: код статуса} и уведомления
+    (название, код статуса, ключ подписки, ключ журнала)
+    по изменившимся работам. Ключ журнала - подписка, домашка,
+    статус и время изменения: повторный разбор того же ответа
+    после сбоя даёт тот же ключ.
+    """
+    changes = {}
+    notices = []
+    for homework in homeworks:
+        homework_name, status = parse_verdict(homework)
+        key = homework_key(homework)
+        if tenant.status_of(key) != status:
+            changes[key] = status
+            updated = homework.get('date_updated', tenant.from_date)
+            notices.append((
+                homework_name, status, tenant.key,
+                f'{tenant.key}:{key}:{status:d}:{updated}'))
+    if not notices:
+        logger.info('Статус домашней работы не поменяося')
+    return changes, notices
+
+
+def put_notices(notifier, tenant, notices):
+    """Ставит уведомления в очередь: очередь склеит их в одно."""
+    for notice in notices:
+        notifier.put(tenant.chat_id, notice)
+
+
+def commit_status(tenant, current_date, changes):
+    """Запоминает статусы и сдвигает курсор подписки."""
+    if changes:
+        logger.info('Удачная отправка сообщения со статусом')
+        tenant.update_statuses(changes)
+    tenant.from_date = current_date
+
+
+def handle_answer(notifier, tenant, response):
+    """Ставит уведомления по ответу API и запоминает статусы."""
+    if response is None:
+        logger.info('Ответ API не изменился')
+        return
+    if isinstance(response, HomeworkStream):
+        changes, notices = diff_homeworks(tenant, response)
+        current_date = response.current_date
+    else:
+        changes, notices = process_response(tenant, response)
+        current_date = response['current_date']
+    put_notices(notifier, tenant, notices)
+    commit_status(tenant, current_date, changes)
+
+
+def handle_push(notifier, store, tenant, payload):
+    """Обрабатывает push-событие так же, как ответ API.
+    Курсор опроса при этом не сдвигается.
+    """
+    changes, notices = process_response(tenant, payload)
+    put_notices(notifier, tenant, notices)
+    if changes:
+        tenant.update_statuses(changes)
+        store.save(tenant)
+
+
+def report_error(notifier, tenant, cache, error):
+    """Сообщает о сбое и сбрасывает кэш ответа подписки.
+    Повторы того же сбоя не отправляются сразу, а копятся в сводку.
+    """
+    if isinstance(error, CircuitOpen):
+        logger.debug('%s', error)
+        return
+    if cache is not None:
+        cache.forget(tenant.key)
+    if isinstance(error, ValueError):
+        logger.error('Сбой в работе программы: %s', error)
+        text = ALERTS.report(tenant.chat_id, error)
+        if text is not None:
+            notifier.put(tenant.chat_id, text)
+        return
+    raise error
+
+
+@traced('poll_tenant')
+def poll_tenant(notifier, tenant, session=None, cache=None, breakers=None):
+    """Один цикл опроса подписки: запрос, проверка, уведомление.
+    Сообщения не отправляются здесь, а ставятся в очередь notifier.
+    """
+    try:
+        response = get_guarded_answer(tenant, session, cache, breakers)
+        handle_answer(notifier, tenant, response)
+    except Exception as error:
+        report_error(notifier, tenant, cache, error)
+    else:
+        logger.info('Бот работает исправно')
+
+
+async def async_poll_tenant(notifier, tenant, client, cache=None,
+                            breakers=None):
+    """Асинхронный цикл опроса подписки на общем клиенте client."""
+    try:
+        response = await async_get_guarded_answer(
+            tenant, client, cache, breakers)
+        handle_answer(notifier, tenant, response)
+    except Exception as error:
+        report_error(notifier, tenant, cache, error)
+    else:
+        logger.info('Бот работает исправно')
+
+
+def register_gauges(notifier, scheduler):
+    """Показатели очереди отправки и планировщика, сервер метрик."""
+    REGISTRY.gauge(
+        'send_queue_depth', 'Сообщения в очереди отправки',
+        notifier.__len__)
+    REGISTRY.gauge(
+        'tenants_due', 'Подписки, ожидающие опроса', scheduler.due_count)
+    REGISTRY.gauge(
+        'tenants', 'Подписки в реестре', scheduler.registry.__len__)
+    REGISTRY.gauge(
+        'polls_in_flight', 'Опросы в пуле потоков',
+        lambda: scheduler.in_flight)
+    if METRICS_PORT:
+        start_metrics_server(int(METRICS_PORT))
+
+
+def get_poll_policy():
+    """Адаптивный интервал опроса вокруг RETRY_TIME."""
+    return AdaptiveInterval(RETRY_TIME, POLL_MIN_INTERVAL, POLL_MAX_INTERVAL)
+
+
+def get_clients():
+    """Клиенты API и Telegram для режима EXECUTION_MODE.
+    В режиме async оба идут через один асинхронный клиент с пулом
+    keep-alive соединений в event loop фонового потока; loop
+    возвращается третьим, в режиме threads он None.
+    """
+    if EXECUTION_MODE != 'async':
+        return get_session(), get_bot(), None
+    from aio_http import AsyncHTTPClient, start_event_loop
+
+    loop = start_event_loop()
+    client = AsyncHTTPClient(POLL_WORKERS + SEND_WORKERS, REQUEST_TIMEOUT)
+    return client, get_async_bot(client, loop), loop
+
+
+def get_async_bot(client, loop):
+    """Бот для очереди отправки поверх async_send_message.
+    Потоки очереди только ждут результата, запрос идёт в event loop.
+    """
+    import asyncio
+    from types import SimpleNamespace
+
+    def send_message(chat_id, text):
+        return asyncio.run_coroutine_threadsafe(
+            async_send_message(client, chat_id, text), loop).result()
+
+    return SimpleNamespace(send_message=send_message)
+
+
+def get_notifier(bot, outbox=None):
+    """Очередь отправки сообщений с ограничением частоты.
+    С журналом outbox уведомления о статусах переживают перезапуск
+    и не отправляются повторно.
+    """
+    return SendQueue(
+        lambda chat_id, text: send_chat_message(bot, chat_id, text),
+        TELEGRAM_CHAT_RATE,
+        TELEGRAM_GLOBAL_RATE,
+        render=render_notice,
+        outbox=outbox,
+        key=outbox_key,
+        owner=notice_tenant,
+        workers=SEND_WORKERS)
+
+
+def get_outbox():
+    """Журнал уведомлений без давно доставленных записей."""
+    outbox = get_outbox_store(STATE_DB, OUTBOX_RETENTION)
+    outbox.prune(time.time() - OUTBOX_RETENTION)
+    return outbox
+
+
+def get_breakers():
+    """Предохранители эндпоинта Практикума и подписок."""
+    return CircuitBreakers(
+        ENDPOINT, BREAKER_THRESHOLD, BREAKER_DELAY, BREAKER_MAX_DELAY)
+
+
+def reload_config():
+    """Перечитывает .env: файл подписок, интервалы опроса, уровень логов."""
+    global TENANTS_FILE, POLL_MIN_INTERVAL, POLL_MAX_INTERVAL, LOG_LEVEL
+    load_dotenv(override=True)
+    TENANTS_FILE = os.getenv('TENANTS_FILE')
+    POLL_MIN_INTERVAL = int(os.getenv('POLL_MIN_INTERVAL', 120))
+    POLL_MAX_INTERVAL = int(os.getenv('POLL_MAX_INTERVAL', 3600))
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    logging.getLogger().setLevel(LOG_LEVEL)
+
+
+def reload_tenants(store):
+    """Новый состав подписок после перечитывания настроек."""
+    reload_config()
+    registry = load_owned_tenants()
+    store.restore(registry)
+    return registry
+
+
+def handle_signals(stop, reload):
+    """SIGTERM и SIGINT останавливают бота, SIGHUP перечитывает подписки.
+    Обработчики только выставляют флаги: работа идёт в основном цикле.
+    """
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop())
+    signal.signal(signal.SIGHUP, lambda signum, frame: reload())
+
+
+def get_scheduler(notifier, registry, store, breakers, poll):
+    """Планировщик опроса с показателями, сигналами и API управления."""
+    scheduler = Scheduler(
+        registry,
+        poll,
+        RETRY_TIME,
+        POLL_WORKERS,
+        get_poll_policy(),
+        store,
+        breakers,
+        POLL_BATCH_WINDOW,
+        POLL_QUEUE_SIZE)
+    register_gauges(notifier, scheduler)
+
+    def load():
+        registry = reload_tenants(store)
+        scheduler.policy = get_poll_policy()
+        return registry
+
+    handle_signals(scheduler.stop, lambda: scheduler.request_reload(load))
+    if ADMIN_ADDRESS:
+        start_admin_server(ADMIN_ADDRESS, scheduler, owns_tenant)
+    return scheduler
+
+
+def get_ring():
+    """Кольцо воркеров или None, если подписки не делятся."""
+    if not SHARD_NODES:
+        return None
+    ring = HashRing(SHARD_NODES.split(','))
+    if SHARD_ID not in ring.nodes:
+        sys.exit(f'Воркер {SHARD_ID} не входит в SHARD_NODES')
+    return ring
+
+
+def owns_tenant(tenant):
+    """Принадлежит ли подписка этому воркеру."""
+    ring = get_ring()
+    return ring is None or ring.node_for(tenant.key) == SHARD_ID
+
+
+def shard_filter():
+    """Проверка, что подписка с данным ключом у этого воркера.
+    None, если подписки не делятся.
+    """
+    ring = get_ring()
+    if ring is None:
+        return None
+    return lambda key: ring.node_for(key) == SHARD_ID
+
+
+def load_owned_tenants():
+    """Подписки этого воркера.
+    Если задан SHARD_NODES, из общего реестра остаются только
+    подписки, которые консистентное хэширование отдаёт SHARD_ID.
+    """
+    registry = load_tenants(
+        TENANTS_FILE, PRACTICUM_TOKEN, TELEGRAM_CHAT_ID, TEMPLATES)
+    ring = get_ring()
+    if ring is None:
+        return registry
+    owned = owned_tenants(registry, ring, SHARD_ID)
+    logger.info('Воркер %s: %s из %s', SHARD_ID, len(owned), len(registry))
+    return owned
+
+
+def run_shard(index, nodes):
+    """Запускает бота как один из локальных воркеров."""
+    global SHARD_ID, SHARD_NODES, METRICS_PORT, WEBHOOK_PORT
+    global TRACE_FILE, PROFILE_FILE, ADMIN_ADDRESS
+    SHARD_ID = nodes[index]
+    SHARD_NODES = ','.join(nodes)
+    if METRICS_PORT:
+        METRICS_PORT = int(METRICS_PORT) + index
+    if WEBHOOK_PORT:
+        WEBHOOK_PORT = int(WEBHOOK_PORT) + index
+    if ADMIN_ADDRESS:
+        ADMIN_ADDRESS = shard_address(ADMIN_ADDRESS, index)
+    if TRACE_FILE:
+        TRACE_FILE = f'{TRACE_FILE}.{SHARD_ID}'
+    if PROFILE_FILE:
+        PROFILE_FILE = f'{PROFILE_FILE}.{SHARD_ID}'
+    try:
+        main()
+    finally:
+        stop_logging()
+
+
+def run_shards(count):
+    """Делит подписки между count локальными процессами.
+    SIGTERM, SIGINT и SIGHUP передаются воркерам, родитель
+    дожидается их завершения.
+    """
+    import multiprocessing
+
+    nodes = [f'shard-{index}' for index in range(count)]
+    processes = [
+        multiprocessing.Process(
+            target=run_shard, args=(index, nodes), name=node)
+        for index, node in enumerate(nodes)
+    ]
+    for process in processes:
+        process.start()
+
+    def forward(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signum)
+
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(signum, forward)
+    for process in processes:
+        process.join()
+
+
+def run_polling(notifier, session, cache, registry, store, loop=None):
+    """Запускает опрос API на пуле потоков.
+    Если передан loop, опросы идут корутинами в этом event loop.
+    """
+    breakers = get_breakers()
+    if loop is None:
+        scheduler = get_scheduler(
+            notifier, registry, store, breakers,
+            lambda tenant: poll_tenant(
+                notifier, tenant, session, cache, breakers))
+        scheduler.run_forever()
+        return
+    import asyncio
+
+    scheduler = get_scheduler(
+        notifier, registry, store, breakers,
+        lambda tenant: async_poll_tenant(
+            notifier, tenant, session, cache, breakers))
+    asyncio.run_coroutine_threadsafe(scheduler.run_async(), loop).result()
+
+
+def wait_for_push(registry, store):
+    """Ждёт push-события до сигнала остановки.
+    SIGHUP только выставляет флаг, подписки перечитываются в цикле.
+    """
+    stopping = threading.Event()
+    reloading = threading.Event()
+    handle_signals(stopping.set, reloading.set)
+    logger.info('Опрос API отключён, ждём push-события')
+    while not stopping.wait(TICK):
+        if not reloading.is_set():
+            continue
+        reloading.clear()
+        try:
+            registry.sync(reload_tenants(store))
+        except Exception:
+            logger.exception('Не удалось перечитать подписки')
+
+
+def start_diagnostics():
+    """Включает трассировку и профилировщик, если они заданы."""
+    if TRACE_FILE:
+        start_tracing(TRACE_FILE)
+    if PROFILE_FILE:
+        SamplingProfiler(PROFILE_FILE, PROFILE_INTERVAL).start()
+
+
+def shutdown(notifier, store, server=None):
+    """Останавливает приём событий, досылает сообщения, сохраняет курсоры.
+    Недосланные уведомления остаются в журнале до следующего запуска.
+    """
+    logger.info('Остановка бота')
+    if server is not None:
+        server.shutdown()
+    ALERTS.stop()
+    if not notifier.drain(SHUTDOWN_TIMEOUT):
+        logger.warning('Не отправлено сообщений: %s', len(notifier))
+    notifier.stop()
+    store.close()
+    if notifier.outbox is not None:
+        notifier.outbox.close()
+    stop_tracing()
 
 
 def main():
     """Основная логика работы бота."""
-    current_timestamp = int(time.time())
     if not check_tokens():
         sys.exit('Проверьте переменные окружения')
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    last_status = ''
-    while True:
-        try:
-            response = get_api_answer(current_timestamp)
-            homework = check_response(response)
-            if homework:
-                message_tg = parse_status(homework[0])
-                status = message_tg
-                if status != last_status:
-                    send_message(bot, message_tg)
-                    logger.info('Удачная отправка сообщения со статусом')
-                    last_status = status
-                    current_timestamp = response['current_date']
-                else:
-                    logger.info('Статус домашней работы не поменяося')
-        except ValueError as error:
-            message = f'Сбой в работе программы: {error}'
-            logger.error(message)
-            send_message(bot, message)
+    if INGESTION_MODE == 'push' and not WEBHOOK_PORT:
+        sys.exit('Для INGESTION_MODE=push задайте WEBHOOK_PORT')
+    if SHARD_PROCESSES > 1 and not SHARD_NODES:
+        run_shards(SHARD_PROCESSES)
+        return
+    start_diagnostics()
+    session, bot, loop = get_clients()
+    notifier = get_notifier(bot, get_outbox())
+    notifier.restore(shard_filter())
+    notifier.start()
+    ALERTS.start(notifier.put)
+    cache = ResponseCache(RESPONSE_CACHE_SIZE)
+    registry = load_owned_tenants()
+    logger.info('Загружено подписок: %s', len(registry))
+    store = get_state_store(STATE_DB)
+    store.restore(registry)
+    server = None
+    try:
+        if WEBHOOK_PORT:
+            server = start_webhook_server(
+                int(WEBHOOK_PORT),
+                registry,
+                lambda tenant, payload: handle_push(
+                    notifier, store, tenant, payload))
+        if INGESTION_MODE == 'push':
+            wait_for_push(registry, store)
         else:
-            logger.info('Бот работает исправно')
-        finally:
-            time.sleep(RETRY_TIME)
+            run_polling(notifier, session, cache, registry, store, loop)
+    finally:
+        shutdown(notifier, store, server)
+        if loop is not None:
+            from aio_http import stop_event_loop
+
+            stop_event_loop(loop, session)
+
+
+def backfill(workers, rate, force=False):
+    """Загружает историю статусов подписок без уведомлений."""
+    if not STATE_DB:
+        sys.exit('Для загрузки истории задайте STATE_DB')
+    session = get_session(workers)
+    registry = load_owned_tenants()
+    store = get_state_store(STATE_DB)
+    store.restore(registry)
+    tenants = [
+        tenant for tenant in registry if force or tenant.statuses is None]
+    logger.info('Загрузка истории: %s из %s', len(tenants), len(registry))
+    loader = Backfill(
+        lambda tenant: get_api_stream(tenant.token, 0, session),
+        parse_verdict,
+        homework_key,
+        workers,
+        rate)
+    try:
+        seeded = loader.run(tenants, store)
+    finally:
+        store.close()
+    logger.info('История загружена: %s из %s', seeded, len(tenants))
+
+
+def parse_args(argv=None):
+    """Разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(description='Бот статусов домашек.')
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('run', help='опрашивать API и слать уведомления')
+    history = commands.add_parser(
+        'backfill', help='загрузить историю статусов без уведомлений')
+    history.add_argument('--workers', type=int, default=BACKFILL_WORKERS)
+    history.add_argument('--rate', type=float, default=BACKFILL_RATE,
+                         help='запросов к API в секунду')
+    history.add_argument('--force', action='store_true',
+                         help='перезагрузить историю всех подписок')
+    return parser.parse_args(argv)
 
 
 if __name__ == '__main__':
-    main()
+    args = parse_args()
+    if args.command == 'backfill':
+        backfill(args.workers, args.rate, args.force)
+    else:
+        main()
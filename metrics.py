@@ -0,0 +1,205 @@
+import bisect
+import functools
+import inspect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import tracing
+
+LATENCY_BUCKETS = (
+    0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Counter:
+    """Монотонный счётчик."""
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        """Увеличивает счётчик."""
+        with self._lock:
+            self.value += amount
+
+    def expose(self):
+        """Строки метрики в текстовом формате Prometheus."""
+        return [
+            f'# HELP {self.name} {self.help_text}',
+            f'# TYPE {self.name} counter',
+            f'{self.name} {self.value}',
+        ]
+
+
+class Gauge:
+    """Мгновенное значение, читаемое функцией при сборе метрик."""
+
+    def __init__(self, name, help_text, read):
+        self.name = name
+        self.help_text = help_text
+        self.read = read
+
+    def expose(self):
+        """Строки метрики в текстовом формате Prometheus."""
+        return [
+            f'# HELP {self.name} {self.help_text}',
+            f'# TYPE {self.name} gauge',
+            f'{self.name} {self.read()}',
+        ]
+
+
+class Histogram:
+    """Гистограмма длительностей с фиксированными корзинами."""
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Учитывает одно наблюдение."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def expose(self):
+        """Строки метрики в текстовом формате Prometheus."""
+        lines = [
+            f'# HELP {self.name} {self.help_text}',
+            f'# TYPE {self.name} histogram',
+        ]
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {total}')
+        total += self.counts[-1]
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {total}')
+        lines.append(f'{self.name}_sum {self.sum}')
+        lines.append(f'{self.name}_count {total}')
+        return lines
+
+
+class Registry:
+    """Набор метрик процесса."""
+
+    def __init__(self, prefix='homework_bot'):
+        self.prefix = prefix
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, *args):
+        name = f'{self.prefix}_{name}'
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, *args)
+            return self._metrics[name]
+
+    def counter(self, name, help_text):
+        """Возвращает счётчик, создавая его при первом обращении."""
+        return self._get(Counter, name, help_text)
+
+    def histogram(self, name, help_text):
+        """Возвращает гистограмму, создавая её при первом обращении."""
+        return self._get(Histogram, name, help_text)
+
+    def gauge(self, name, help_text, read):
+        """Регистрирует показатель, читаемый функцией read."""
+        name = f'{self.prefix}_{name}'
+        with self._lock:
+            self._metrics[name] = Gauge(name, help_text, read)
+
+    def expose(self):
+        """Все метрики в текстовом формате Prometheus."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def timed(name):
+    """Декоратор: число вызовов, ошибок и длительность функции.
+    При включённой трассировке вызов попадает в неё отрезком name.
+    У корутинной функции меряется выполнение, а не создание корутины.
+    """
+    calls = REGISTRY.counter(f'{name}_calls_total', f'Вызовы {name}')
+    errors = REGISTRY.counter(f'{name}_errors_total', f'Ошибки {name}')
+    latency = REGISTRY.histogram(
+        f'{name}_seconds', f'Длительность {name}, секунды')
+
+    def record(started, failed):
+        if failed:
+            errors.inc()
+        elapsed = time.perf_counter() - started
+        latency.observe(elapsed)
+        if tracing.TRACER is not None:
+            tracing.TRACER.add(name, started, elapsed)
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                calls.inc()
+                failed = True
+                try:
+                    result = await func(*args, **kwargs)
+                    failed = False
+                    return result
+                finally:
+                    record(started, failed)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            calls.inc()
+            failed = True
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                record(started, failed)
+        return wrapper
+    return decorator
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Отдаёт метрики по GET /metrics."""
+
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = self.registry.expose().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host='127.0.0.1', registry=REGISTRY):
+    """Запускает HTTP-сервер метрик в фоновом потоке."""
+    handler = type('Handler', (MetricsHandler,), {'registry': registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(
+        target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
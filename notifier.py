@@ -0,0 +1,292 @@
+import threading
+import time
+from collections import OrderedDict
+
+from app_logger import get_logger
+
+logger = get_logger(__name__)
+
+MAX_MESSAGE_LENGTH = 4096
+
+
+class TokenBucket:
+    """Ограничитель частоты: rate токенов в секунду, запас capacity."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def wait_time(self, now):
+        """Через сколько секунд появится токен."""
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        """Забирает токен, проверенный через wait_time."""
+        self.tokens -= 1
+
+
+class PendingChat:
+    """Накопленные для одного чата сообщения и попытки отправки."""
+
+    def __init__(self):
+        self.messages = []
+        self.attempts = 0
+        self.not_before = 0
+
+
+def is_transient(error):
+    """Можно ли повторить отправку после такой ошибки."""
+    from telegram.error import BadRequest, NetworkError, RetryAfter
+
+    error = error.__cause__ or error
+    if isinstance(error, RetryAfter):
+        return True
+    return isinstance(error, NetworkError) and not isinstance(
+        error, BadRequest)
+
+
+def retry_delay(error, attempt, backoff, limit):
+    """Пауза перед повтором: из RetryAfter или экспоненциальная,
+    но не больше limit.
+    """
+    from telegram.error import RetryAfter
+
+    error = error.__cause__ or error
+    if isinstance(error, RetryAfter):
+        return error.retry_after
+    return min(backoff * 2 ** min(attempt, 32), limit)
+
+
+class SendQueue:
+    """Фоновая очередь отправки сообщений в Telegram.
+    Ограничивает частоту отправки в каждый чат и в целом,
+    склеивает накопившиеся для чата сообщения в одно
+    и повторяет отправку при временных сбоях с растущей паузой,
+    не больше max_backoff секунд, пока Telegram не ответит: сообщение
+    снимается с очереди только после отправки или постоянной ошибки.
+    После retries неудачных попыток повторы пишутся в лог как ошибки.
+    send(chat_id, text) - функция отправки одного сообщения,
+    render(chat_id, item) - превращает элемент очереди в текст
+    при отправке. Отправку ведут workers потоков, в один чат
+    одновременно отправляет только один. Если задан журнал outbox,
+    элементы, для которых key(item) возвращает ключ, сначала
+    записываются в журнал: повтор ключа в очередь не попадает,
+    а после отправки запись помечается доставленной. owner(item)
+    даёт ключ подписки, к которой запись относится в журнале.
+    """
+
+    def __init__(self, send, chat_rate=1, global_rate=30, retries=3,
+                 backoff=1, render=None, outbox=None, key=None, workers=1,
+                 max_backoff=300, owner=None):
+        self.send = send
+        self.render = render or (lambda chat_id, item: str(item))
+        self.outbox = outbox
+        self.key = key or (lambda item: None)
+        self.owner = owner or (lambda item: None)
+        self.chat_rate = chat_rate
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._global = TokenBucket(global_rate, global_rate)
+        self._buckets = {}
+        self._pending = OrderedDict()
+        self._in_flight = 0
+        self._sending = set()
+        self.workers = workers
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._threads = []
+
+    def put(self, chat_id, item):
+        """Ставит сообщение в очередь, повторы одного текста склеиваются."""
+        key = self.key(item)
+        if self.outbox is not None and key is not None:
+            if not self.outbox.add(key, chat_id, item, self.owner(item)):
+                return
+        self._enqueue(chat_id, item)
+
+    def restore(self, owns=None):
+        """Ставит в очередь недоставленные записи журнала.
+        Если задан owns, только записи подписок, для которых
+        owns(ключ подписки) истинно.
+        """
+        if self.outbox is None:
+            return 0
+        pending = self.outbox.pending(owns)
+        for chat_id, item in pending:
+            self._enqueue(chat_id, item)
+        logger.info('Недоставленных уведомлений из журнала: %s', len(pending))
+        return len(pending)
+
+    def _enqueue(self, chat_id, item):
+        with self._cond:
+            chat = self._pending.setdefault(chat_id, PendingChat())
+            if item not in chat.messages:
+                chat.messages.append(item)
+            self._cond.notify()
+
+    def __len__(self):
+        with self._cond:
+            return sum(
+                len(chat.messages) for chat in self._pending.values())
+
+    def start(self):
+        """Запускает потоки отправки."""
+        self._threads = [
+            threading.Thread(
+                target=self.run, name=f'send-queue-{index}', daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Останавливает потоки отправки."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def drain(self, timeout=None):
+        """Ждёт, пока очередь опустеет. Возвращает True, если успела."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._in_flight:
+                left = None if deadline is None else (
+                    deadline - time.monotonic())
+                if left is not None and left <= 0:
+                    return False
+                self._cond.wait(left)
+        return True
+
+    def run(self):
+        """Цикл потока отправки."""
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                chat_id, delay = self._pick(time.monotonic())
+                if chat_id is None:
+                    self._cond.wait(delay)
+                    continue
+                chat = self._pending.pop(chat_id)
+                self._sending.add(chat_id)
+                self._in_flight += 1
+            try:
+                self._deliver(chat_id, chat)
+            finally:
+                with self._cond:
+                    self._sending.discard(chat_id)
+                    self._in_flight -= 1
+                    self._cond.notify_all()
+
+    def _bucket(self, chat_id):
+        if chat_id not in self._buckets:
+            self._buckets[chat_id] = TokenBucket(self.chat_rate)
+        return self._buckets[chat_id]
+
+    def _pick(self, now):
+        """Выбирает чат, в который можно отправлять прямо сейчас.
+        Чаты, в которые уже идёт отправка, пропускаются; если других
+        нет, задержка None - поток ждёт, пока отправка закончится.
+        """
+        if not self._pending:
+            return None, None
+        delay = self._global.wait_time(now)
+        if delay:
+            return None, delay
+        delay = None
+        for chat_id, chat in self._pending.items():
+            if chat_id in self._sending:
+                continue
+            bucket = self._bucket(chat_id)
+            wait = max(chat.not_before - now, bucket.wait_time(now))
+            if wait <= 0:
+                bucket.take()
+                self._global.take()
+                return chat_id, 0
+            delay = wait if delay is None else min(delay, wait)
+        return None, delay
+
+    def _deliver(self, chat_id, chat):
+        batch, texts, broken = self._render(chat_id, chat.messages)
+        if broken:
+            self._complete(broken)
+            chat.messages = [
+                item for item in chat.messages if item not in broken]
+        rest = chat.messages[len(batch):]
+        if not texts:
+            self._requeue(chat_id, rest, PendingChat())
+            return
+        try:
+            self.send(chat_id, '\n\n'.join(texts))
+        except Exception as error:
+            if not is_transient(error):
+                logger.error(
+                    'Сообщение в чат %s не отправлено: %s', chat_id, error)
+                self._complete(batch)
+                self._requeue(chat_id, rest, PendingChat())
+                return
+            chat.not_before = time.monotonic() + retry_delay(
+                error, chat.attempts, self.backoff, self.max_backoff)
+            chat.attempts += 1
+            log = logger.warning
+            if chat.attempts > self.retries:
+                log = logger.error
+            log('Повтор отправки в чат %s, попытка %s: %s', chat_id,
+                chat.attempts, error)
+            self._requeue(chat_id, chat.messages, chat)
+            return
+        self._complete(batch)
+        self._requeue(chat_id, rest, PendingChat())
+
+    def _render(self, chat_id, messages):
+        """Тексты для одной отправки в пределах MAX_MESSAGE_LENGTH.
+        Возвращает взятые элементы, их тексты и элементы, которые
+        не удалось превратить в текст: такие не отправляются.
+        """
+        batch, texts, broken = [], [], []
+        length = 0
+        for item in messages:
+            try:
+                text = self.render(chat_id, item)
+            except Exception:
+                logger.exception('Не удалось собрать текст для %s', chat_id)
+                broken.append(item)
+                continue
+            length += len(text) + 2
+            if texts and length > MAX_MESSAGE_LENGTH:
+                break
+            batch.append(item)
+            texts.append(text)
+        return batch, texts, broken
+
+    def _complete(self, items):
+        """Помечает в журнале элементы, покинувшие очередь."""
+        if self.outbox is None:
+            return
+        keys = [key for key in map(self.key, items) if key is not None]
+        if keys:
+            self.outbox.complete(keys)
+
+    def _requeue(self, chat_id, messages, chat):
+        if not messages:
+            return
+        with self._cond:
+            newer = self._pending.pop(chat_id, None)
+            chat.messages = list(messages)
+            if newer is not None:
+                chat.messages += [
+                    text for text in newer.messages
+                    if text not in chat.messages]
+            self._pending[chat_id] = chat
+            self._cond.notify()
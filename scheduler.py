@@ -0,0 +1,367 @@
+import heapq
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from queue import Empty, SimpleQueue
+
+from app_logger import get_logger
+from storage import restore_state
+from tenants import Status
+
+logger = get_logger(__name__)
+
+TICK = 1
+
+
+class AdaptiveInterval:
+    """Подбирает интервал опроса по статусу и давности изменений.
+    Работа на проверке опрашивается чаще всего, давно не менявшиеся
+    подписки - всё реже, вплоть до maximum. Пока статус неизвестен,
+    интервал не меньше base. Jitter разносит опросы во времени,
+    чтобы они не срабатывали разом.
+    """
+
+    IDLE_FACTOR = 0.1
+
+    def __init__(self, base, minimum, maximum, jitter=0.1):
+        self.base = base
+        self.minimum = minimum
+        self.maximum = maximum
+        self.jitter = jitter
+
+    def initial(self, tenant):
+        """Задержка первого опроса: разброс в пределах базового интервала."""
+        return random.uniform(0, self.base * self.jitter)
+
+    def __call__(self, tenant, now):
+        if tenant.status == Status.REVIEWING:
+            interval = self.minimum
+        else:
+            floor = self.base if tenant.status is None else self.minimum
+            idle = now - tenant.changed_at
+            interval = min(
+                max(idle * self.IDLE_FACTOR, floor), self.maximum)
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+class Scheduler:
+    """Планировщик опроса всех подписок из одного процесса.
+    Очередь - куча (время опроса, токен), устаревшие записи
+    отбрасываются при извлечении. Пулу потоков отдаётся не больше
+    max_workers + queue_size опросов, остальные ждут в куче.
+    Другие потоки меняют очередь только через call_soon().
+    """
+
+    def __init__(self, registry, poll, interval, max_workers, policy=None,
+                 store=None, breakers=None, batch_window=0, queue_size=0):
+        self.registry = registry
+        self.poll = poll
+        self.interval = interval
+        self.max_workers = max_workers
+        self.policy = policy
+        self.store = store
+        self.breakers = breakers
+        self.batch_window = batch_window
+        self.queue_size = queue_size
+        self.in_flight = 0
+        self._finished = SimpleQueue()
+        self._commands = SimpleQueue()
+        self.paused = set()
+        self.running = set()
+        self._repoll = set()
+        self._queue = []
+        self._wake = threading.Event()
+        self._stopped = False
+        self._reload = None
+        for tenant in registry:
+            self.schedule(tenant, self.initial_delay(tenant))
+
+    def initial_delay(self, tenant):
+        """Задержка первого опроса подписки.
+        После перезапуска учитывается сохранённое время опроса.
+        """
+        delay = max(0, tenant.next_poll - time.time())
+        if self.policy is not None:
+            delay += self.policy.initial(tenant)
+        return delay
+
+    def next_delay(self, tenant):
+        """Задержка до следующего опроса подписки.
+        Не меньше паузы разомкнутого предохранителя; к ней добавляется
+        разброс, чтобы после паузы подписки не пошли опрашиваться разом.
+        """
+        if self.policy is None:
+            delay = self.interval
+        else:
+            delay = self.policy(tenant, time.time())
+        if self.breakers is not None:
+            backoff = self.breakers.retry_in(tenant)
+            if backoff > delay:
+                delay = backoff * random.uniform(1, 1.2)
+        return delay
+
+    def add(self, tenant, manual=False):
+        """Регистрирует подписку и ставит её на ближайший опрос.
+        Если подписка уже была, её состояние поднимается из хранилища.
+        manual - подписка добавлена вручную и переживает reload().
+        """
+        if self.store is not None:
+            state = self.store.load(tenant.key)
+            if state:
+                restore_state(tenant, state)
+        self.registry.add(tenant, manual)
+        self.schedule(tenant, 0)
+
+    def remove(self, tenant):
+        """Снимает подписку; её запись в очереди отбросится при извлечении."""
+        self.registry.remove(tenant.token)
+        self.paused.discard(tenant.token)
+
+    def pause(self, tenant):
+        """Приостанавливает опрос подписки."""
+        self.paused.add(tenant.token)
+
+    def resume(self, tenant):
+        """Возобновляет опрос подписки с ближайшего цикла."""
+        if tenant.token in self.paused:
+            self.paused.discard(tenant.token)
+            self.poll_now(tenant)
+
+    def poll_now(self, tenant):
+        """Ставит подписку на опрос вне расписания.
+        Если подписка уже опрашивается, новый опрос начнётся сразу
+        после текущего, а не параллельно ему.
+        """
+        if tenant.token in self.running:
+            self._repoll.add(tenant.token)
+        else:
+            self.schedule(tenant, 0)
+
+    def call_soon(self, func, *args):
+        """Выполняет func(*args) в потоке планировщика.
+        Команда применяется при ближайшем пробуждении цикла,
+        куча при этом не перестраивается.
+        """
+        self._commands.put((func, args))
+        self._wake.set()
+
+    def run_commands(self):
+        """Выполняет накопленные команды других потоков."""
+        while True:
+            try:
+                func, args = self._commands.get_nowait()
+            except Empty:
+                return
+            try:
+                func(*args)
+            except Exception:
+                logger.exception('Сбой команды %s', func.__name__)
+
+    def stop(self):
+        """Просит цикл завершиться после опросов, которые уже идут."""
+        self._stopped = True
+        self._wake.set()
+
+    def request_reload(self, load):
+        """Просит цикл заменить подписки на load() между опросами."""
+        self._reload = load
+        self._wake.set()
+
+    def reload(self, registry):
+        """Применяет новый состав подписок без перезапуска.
+        Новые подписки ставятся на опрос, удалённые выпадают
+        из очереди при извлечении.
+        """
+        added = self.registry.sync(registry)
+        for tenant in added:
+            self.schedule(tenant, self.initial_delay(tenant))
+        logger.info(
+            'Подписки перечитаны: %s, новых %s',
+            len(self.registry), len(added))
+
+    def wait(self, timeout):
+        """Спит до ближайшего опроса, останова или перезагрузки.
+        Запрошенная перезагрузка применяется здесь же, в потоке цикла.
+        """
+        self._wake.wait(timeout)
+        self._wake.clear()
+        self.run_commands()
+        load, self._reload = self._reload, None
+        if load is not None:
+            try:
+                self.reload(load())
+            except Exception:
+                logger.exception('Не удалось перечитать подписки')
+        return not self._stopped
+
+    def schedule(self, tenant, delay):
+        """Ставит подписку в очередь через delay секунд."""
+        tenant.next_poll = time.time() + delay
+        heapq.heappush(self._queue, (tenant.next_poll, tenant.token))
+
+    def reschedule(self, tenant):
+        """Ставит опрошенную подписку в очередь и сохраняет её состояние."""
+        self.schedule(tenant, self.next_delay(tenant))
+        if self.store is not None:
+            self.store.save(tenant)
+
+    def due(self, now=None, limit=None):
+        """Забирает из очереди подписки, которым пора на опрос.
+        Вместе с ними забираются и те, чей срок наступит в пределах
+        batch_window: опросы идут пачкой по прогретым соединениям
+        пула, а планировщик реже просыпается. limit ограничивает
+        число подписок, остальные остаются в очереди. Подписки
+        на паузе и те, что уже опрашиваются, пропускаются.
+        """
+        now = now or time.time()
+        horizon = now + self.batch_window
+        tenants = []
+        while self._queue and self._queue[0][0] <= horizon:
+            if limit is not None and len(tenants) >= limit:
+                break
+            next_poll, token = heapq.heappop(self._queue)
+            tenant = self._live(next_poll, token)
+            if tenant is not None:
+                tenants.append(tenant)
+                self.running.add(token)
+        return tenants
+
+    def due_count(self, now=None):
+        """Сколько подписок ждут опроса прямо сейчас.
+        Считаются те же записи, что отдал бы due(). Обходятся только
+        записи кучи со сроком до now: срок потомка не раньше родителя.
+        Вызывается и из потока метрик, поэтому куча может укоротиться
+        во время обхода: выпавшие записи просто не считаются.
+        """
+        now = now or time.time()
+        queue = self._queue
+        count = 0
+        stack = [0]
+        while stack:
+            index = stack.pop()
+            try:
+                next_poll, token = queue[index]
+            except IndexError:
+                continue
+            if next_poll > now:
+                continue
+            if self._live(next_poll, token) is not None:
+                count += 1
+            stack += (2 * index + 1, 2 * index + 2)
+        return count
+
+    def _live(self, next_poll, token):
+        """Подписка записи кучи, если запись не устарела и подписку
+        можно опрашивать: она не на паузе и не опрашивается сейчас.
+        """
+        tenant = self.registry.get(token)
+        if (tenant is not None and tenant.next_poll == next_poll
+                and token not in self.paused
+                and token not in self.running):
+            return tenant
+        return None
+
+    def sleep_time(self):
+        """Сколько можно спать до ближайшего опроса."""
+        if not self._queue:
+            return self.interval
+        return max(0, self._queue[0][0] - time.time())
+
+    def capacity(self):
+        """Сколько ещё опросов можно отдать пулу."""
+        return self.max_workers + self.queue_size - self.in_flight
+
+    def submit_due(self, executor):
+        """Отдаёт пулу подписки, которым пора, пока в нём есть место.
+        Завершённые опросы переставляются в очередь здесь же, в потоке
+        планировщика; не поместившиеся подписки ждут в куче.
+        """
+        self.collect()
+        tenants = self.due(limit=self.capacity())
+        for tenant in tenants:
+            self.in_flight += 1
+            executor.submit(self._poll, tenant).add_done_callback(
+                lambda future, tenant=tenant: self._finish(tenant))
+        return len(tenants)
+
+    def collect(self):
+        """Переставляет в очередь подписки с завершённым опросом."""
+        while True:
+            try:
+                tenant = self._finished.get_nowait()
+            except Empty:
+                return
+            self.in_flight -= 1
+            self.finish(tenant)
+
+    def finish(self, tenant):
+        """Завершает опрос: следующий по расписанию или сразу, если
+        его запросили, пока шёл текущий.
+        """
+        self.running.discard(tenant.token)
+        self.reschedule(tenant)
+        if tenant.token in self._repoll:
+            self._repoll.discard(tenant.token)
+            self.schedule(tenant, 0)
+
+    def _finish(self, tenant):
+        self._finished.put(tenant)
+        self._wake.set()
+
+    def run_forever(self):
+        """Основной цикл планировщика на пуле потоков.
+        Медленная подписка занимает один поток и не задерживает
+        остальные; пока пул заполнен, новые опросы не начинаются.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while not self._stopped:
+                self.submit_due(executor)
+                if self.capacity() > 0:
+                    self.wait(self.sleep_time())
+                else:
+                    self.wait(TICK)
+        self.collect()
+
+    async def run_async(self):
+        """Основной цикл на asyncio.
+        poll - корутинная функция. Одновременно выполняется не больше
+        max_workers опросов, своей очереди ждут ещё queue_size,
+        остальные подписки остаются в куче. После останова цикл
+        дожидается начатых опросов.
+        """
+        import asyncio
+
+        semaphore = asyncio.Semaphore(self.max_workers)
+        tasks = set()
+
+        async def guarded(tenant):
+            try:
+                async with semaphore:
+                    await self._poll_async(tenant)
+            finally:
+                self.in_flight -= 1
+                self.finish(tenant)
+
+        while not self._stopped:
+            for tenant in self.due(limit=self.capacity()):
+                self.in_flight += 1
+                task = asyncio.create_task(guarded(tenant))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.sleep(min(self.sleep_time(), TICK))
+            self.wait(0)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    def _poll(self, tenant):
+        try:
+            self.poll(tenant)
+        except Exception:
+            logger.exception('Сбой опроса подписки %r', tenant)
+
+    async def _poll_async(self, tenant):
+        try:
+            await self.poll(tenant)
+        except Exception:
+            logger.exception('Сбой опроса подписки %r', tenant)
@@ -0,0 +1,62 @@
+import bisect
+import hashlib
+
+from tenants import TenantRegistry
+
+
+def ring_hash(value):
+    """Позиция значения на кольце."""
+    return int.from_bytes(
+        hashlib.md5(value.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """Консистентное хэширование подписок по воркерам.
+    Каждый воркер занимает replicas точек на кольце, подписка
+    принадлежит первому воркеру по часовой стрелке от её хэша.
+    При добавлении или удалении воркера переезжает только его доля.
+    """
+
+    def __init__(self, nodes=(), replicas=100):
+        self.replicas = replicas
+        self._points = []
+        self._owners = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        """Добавляет воркер на кольцо."""
+        for index in range(self.replicas):
+            point = ring_hash(f'{node}#{index}')
+            if point not in self._owners:
+                bisect.insort(self._points, point)
+                self._owners[point] = node
+
+    def remove(self, node):
+        """Убирает воркер с кольца."""
+        for index in range(self.replicas):
+            point = ring_hash(f'{node}#{index}')
+            if self._owners.get(point) == node:
+                del self._owners[point]
+                self._points.remove(point)
+
+    @property
+    def nodes(self):
+        """Воркеры на кольце."""
+        return set(self._owners.values())
+
+    def node_for(self, key):
+        """Воркер, которому принадлежит ключ."""
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, ring_hash(key))
+        return self._owners[self._points[index % len(self._points)]]
+
+
+def owned_tenants(registry, ring, node):
+    """Подписки реестра, принадлежащие воркеру node."""
+    owned = TenantRegistry()
+    for tenant in registry:
+        if ring.node_for(tenant.key) == node:
+            owned.add(tenant)
+    return owned
@@ -0,0 +1,271 @@
+import json
+import sqlite3
+import threading
+import time
+
+from app_logger import get_logger
+from tenants import Status
+
+logger = get_logger(__name__)
+
+FIELDS = ('from_date', 'statuses', 'status', 'changed_at', 'next_poll')
+
+
+def snapshot(tenant):
+    """Сохраняемая часть состояния подписки."""
+    state = {field: getattr(tenant, field) for field in FIELDS}
+    if tenant.statuses is not None:
+        state['statuses'] = dict(tenant.statuses)
+    return state
+
+
+def restore_state(tenant, state):
+    """Возвращает подписке сохранённое состояние."""
+    for field, value in state.items():
+        setattr(tenant, field, value)
+    if state['statuses'] is not None:
+        tenant.statuses = {
+            key: Status(code) for key, code in state['statuses'].items()}
+    if state['status'] is not None:
+        tenant.status = Status(state['status'])
+
+
+class StateStore:
+    """Хранилище курсоров и последних статусов подписок в памяти.
+    Записи копятся в буфере и сбрасываются пачкой через flush().
+    """
+
+    def __init__(self, batch_size=100, flush_interval=5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._states = {}
+
+    def load(self, key):
+        """Возвращает сохранённое состояние подписки или None."""
+        return self._states.get(key)
+
+    def restore(self, registry):
+        """Поднимает сохранённое состояние всех подписок реестра."""
+        restored = 0
+        for tenant in registry:
+            state = self.load(tenant.key)
+            if state:
+                restore_state(tenant, state)
+                restored += 1
+        logger.info('Восстановлено состояние подписок: %s', restored)
+        return restored
+
+    def save(self, tenant):
+        """Ставит состояние подписки в буфер записи."""
+        with self._lock:
+            self._pending[tenant.key] = snapshot(tenant)
+            due = (
+                len(self._pending) >= self.batch_size
+                or time.monotonic() - self._flushed_at >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Записывает накопленный буфер одной пачкой."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed_at = time.monotonic()
+            if pending:
+                self._write(pending)
+
+    def close(self):
+        """Сбрасывает буфер перед остановкой."""
+        self.flush()
+
+    def _write(self, pending):
+        self._states.update(pending)
+
+
+class SQLiteStateStore(StateStore):
+    """Хранилище состояния подписок в локальной базе SQLite."""
+
+    def __init__(self, path, batch_size=100, flush_interval=5):
+        super().__init__(batch_size, flush_interval)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS tenant_state ('
+            'key TEXT PRIMARY KEY, from_date INTEGER, statuses TEXT, '
+            'status INTEGER, changed_at REAL, next_poll REAL)')
+        self._db.commit()
+
+    def load(self, key):
+        with self._lock:
+            row = self._db.execute(
+                f'SELECT {", ".join(FIELDS)} FROM tenant_state WHERE key = ?',
+                (key,)).fetchone()
+        if row is None:
+            return None
+        state = dict(zip(FIELDS, row))
+        state['statuses'] = json.loads(state['statuses'])
+        return state
+
+    def close(self):
+        super().close()
+        self._db.close()
+
+    def _write(self, pending):
+        rows = [
+            (key, *(
+                json.dumps(state[field]) if field == 'statuses'
+                else state[field] for field in FIELDS))
+            for key, state in pending.items()
+        ]
+        with self._db:
+            self._db.executemany(
+                'INSERT OR REPLACE INTO tenant_state '
+                'VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+
+def owned(owns, tenant):
+    """Относится ли запись журнала к подпискам воркера."""
+    return owns is None or (tenant is not None and owns(tenant))
+
+
+class OutboxStore:
+    """Журнал уведомлений в памяти.
+    Запись с ключом добавляется один раз; после отправки
+    помечается доставленной и больше не возвращается в pending().
+    Если задан retention, доставленные записи старше retention
+    секунд удаляются при complete(), не чаще раза в prune_interval.
+    У записи может быть подписка-владелец tenant: по ней pending()
+    отбирает уведомления воркера, когда подписки поделены.
+    """
+
+    def __init__(self, retention=None, prune_interval=3600):
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self._pruned_at = time.time()
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def add(self, key, chat_id, notice, tenant=None):
+        """Записывает уведомление. False, если ключ уже был."""
+        with self._lock:
+            if key in self._entries:
+                return False
+            self._entries[key] = [chat_id, notice, time.time(), None, tenant]
+            return True
+
+    def complete(self, keys):
+        """Помечает уведомления доставленными."""
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._entries[key][3] = now
+        self._prune_due(now)
+
+    def pending(self, owns=None):
+        """Недоставленные уведомления (chat_id, notice) по порядку.
+        Если задан owns, только те, чью подписку owns(tenant) признаёт.
+        """
+        with self._lock:
+            return [
+                (chat_id, notice)
+                for chat_id, notice, _, sent_at, tenant
+                in self._entries.values()
+                if sent_at is None and owned(owns, tenant)
+            ]
+
+    def prune(self, before):
+        """Забывает доставленные до before уведомления."""
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry[3] is not None and entry[3] < before:
+                    del self._entries[key]
+
+    def _prune_due(self, now):
+        """Удаляет устаревшие записи, если подошёл срок."""
+        if (self.retention is None
+                or now - self._pruned_at < self.prune_interval):
+            return
+        self._pruned_at = now
+        self.prune(now - self.retention)
+
+    def close(self):
+        """Закрывает журнал."""
+
+
+class SQLiteOutboxStore(OutboxStore):
+    """Журнал уведомлений в той же базе SQLite, что и состояние.
+    Каждая запись фиксируется сразу: уведомление должно попасть
+    в журнал раньше, чем сохранятся новые статусы подписки.
+    Уведомление хранится как JSON-список, код статуса - числом.
+    """
+
+    def __init__(self, path, retention=None, prune_interval=3600):
+        super().__init__(retention, prune_interval)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS outbox ('
+            'key TEXT PRIMARY KEY, chat_id, notice TEXT, '
+            'created_at REAL, sent_at REAL, tenant TEXT)')
+        columns = [
+            row[1] for row in self._db.execute('PRAGMA table_info(outbox)')]
+        if 'tenant' not in columns:
+            # Ключи прежних записей начинаются с ключа подписки.
+            self._db.execute('ALTER TABLE outbox ADD COLUMN tenant TEXT')
+            self._db.execute(
+                "UPDATE outbox SET tenant = "
+                "substr(key, 1, instr(key, ':') - 1) "
+                "WHERE instr(key, ':') > 0")
+        self._db.commit()
+
+    def add(self, key, chat_id, notice, tenant=None):
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                'INSERT OR IGNORE INTO outbox '
+                '(key, chat_id, notice, created_at, tenant) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (key, chat_id, json.dumps(notice), time.time(), tenant))
+        return cursor.rowcount == 1
+
+    def complete(self, keys):
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany(
+                'UPDATE outbox SET sent_at = ? WHERE key = ?',
+                [(now, key) for key in keys])
+        self._prune_due(now)
+
+    def pending(self, owns=None):
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT chat_id, notice, tenant FROM outbox '
+                'WHERE sent_at IS NULL ORDER BY created_at').fetchall()
+        return [
+            (chat_id, tuple(json.loads(notice)))
+            for chat_id, notice, tenant in rows if owned(owns, tenant)]
+
+    def prune(self, before):
+        with self._lock, self._db:
+            self._db.execute(
+                'DELETE FROM outbox WHERE sent_at < ?', (before,))
+
+    def close(self):
+        self._db.close()
+
+
+def get_outbox_store(path=None, retention=None):
+    """SQLite-журнал уведомлений, если задан путь, иначе журнал в памяти."""
+    if path:
+        return SQLiteOutboxStore(path, retention)
+    return OutboxStore(retention)
+
+
+def get_state_store(path=None):
+    """SQLite-хранилище, если задан путь, иначе хранилище в памяти."""
+    if path:
+        return SQLiteStateStore(path)
+    return StateStore()
@@ -0,0 +1,148 @@
+import codecs
+import json
+
+DECODER = json.JSONDecoder()
+WHITESPACE = ' \t\n\r'
+TRIM_SIZE = 65536
+
+HOMEWORK_SCHEMA = {
+    'homework_name': str,
+    'status': str,
+}
+
+
+def compile_schema(schema):
+    """Собирает проверку словаря по схеме {ключ: тип} в одну функцию."""
+    items = tuple(schema.items())
+
+    def validate(item):
+        if not isinstance(item, dict):
+            raise TypeError(
+                f'Домашка в ответе API - {type(item).__name__}, '
+                'а не словарь.')
+        for key, expected in items:
+            if key not in item:
+                raise KeyError(f'Нет ключа "{key}" в homework')
+            if not isinstance(item[key], expected):
+                raise TypeError(
+                    f'Ключ "{key}" домашки - {type(item[key]).__name__}.')
+        return item
+    return validate
+
+
+validate_homework = compile_schema(HOMEWORK_SCHEMA)
+
+
+class HomeworkStream:
+    """Потоковый разбор ответа API.
+    Итерация отдаёт домашки по одной по мере чтения тела ответа,
+    не собирая весь список в памяти. current_date доступен
+    после того, как поток прочитан до конца.
+    """
+
+    def __init__(self, chunks, validate=validate_homework, close=None):
+        self._chunks = iter(chunks)
+        self._validate = validate
+        self._close = close
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        self.current_date = None
+
+    def __iter__(self):
+        try:
+            yield from self._parse()
+        finally:
+            if self._close is not None:
+                self._close()
+
+    def _read(self):
+        """Дочитывает следующий кусок тела. False - тело кончилось."""
+        if self._eof:
+            return False
+        if self._pos > TRIM_SIZE:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                self._buffer += text
+                return True
+        self._buffer += self._decoder.decode(b'', final=True)
+        self._eof = True
+        return False
+
+    def _skip(self):
+        """Пропускает пробелы, возвращает следующий символ или ''."""
+        while True:
+            while (self._pos < len(self._buffer)
+                   and self._buffer[self._pos] in WHITESPACE):
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read():
+                return ''
+
+    def _expect(self, chars):
+        char = self._skip()
+        if char not in chars or not char:
+            raise ValueError(
+                f'Некорректный JSON в ответе API: ожидалось {chars!r}, '
+                f'получено {char!r}')
+        self._pos += 1
+        return char
+
+    def _value(self):
+        """Читает одно JSON-значение целиком."""
+        self._skip()
+        while True:
+            try:
+                value, end = DECODER.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._read():
+                    continue
+                raise
+            if end == len(self._buffer) and self._read():
+                continue
+            self._pos = end
+            return value
+
+    def _parse(self):
+        if self._skip() != '{':
+            raise TypeError('Ответ от API. Тип не словарь.')
+        self._pos += 1
+        seen = set()
+        if self._skip() == '}':
+            self._pos += 1
+        else:
+            while True:
+                key = self._value()
+                self._expect(':')
+                seen.add(key)
+                if key == 'homeworks':
+                    yield from self._homeworks()
+                elif key == 'current_date':
+                    self.current_date = self._value()
+                else:
+                    self._value()
+                if self._expect(',}') == '}':
+                    break
+        if 'homeworks' not in seen or 'current_date' not in seen:
+            raise KeyError(
+                'В ответе от API присутствуют ключ(и) '
+                '"homeworks" и/или "current_date".'
+                f' Ключи ответа: {sorted(seen)}.')
+
+    def _homeworks(self):
+        if self._skip() != '[':
+            raise TypeError(
+                'В ответе от API под ключом "homeworks" пришел не список.')
+        self._pos += 1
+        if self._skip() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self._validate(self._value())
+            if self._expect(',]') == ']':
+                return
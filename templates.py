@@ -0,0 +1,77 @@
+import functools
+import string
+
+from tenants import Status
+
+STATUS_CHANGED = {
+    'ru': 'Изменился статус проверки работы "{homework_name}". {verdict}',
+    'en': 'Review status of "{homework_name}" has changed. {verdict}',
+}
+VERDICTS = {
+    'en': {
+        Status.APPROVED: 'The reviewer approved the work. Hooray!',
+        Status.REVIEWING: 'The work is being reviewed.',
+        Status.REJECTED: 'The reviewer left some comments.',
+    },
+}
+FIELDS = {'homework_name', 'verdict'}
+
+
+def compile_template(template):
+    """Проверяет шаблон и возвращает готовую функцию подстановки.
+    Кроме имён полей проверяется и пробная подстановка, чтобы
+    ошибки формата всплывали при загрузке, а не при отправке.
+    """
+    fields = {
+        field for _, field, _, _ in string.Formatter().parse(template)
+        if field is not None
+    }
+    if not fields <= FIELDS:
+        raise ValueError(
+            f'Неизвестные поля шаблона: {sorted(fields - FIELDS)}')
+    try:
+        template.format(**{field: 'x' for field in FIELDS})
+    except (ValueError, TypeError) as error:
+        raise ValueError(f'Ошибка в шаблоне {template!r}: {error}') from error
+    return template.format
+
+
+class TemplateRegistry:
+    """Шаблоны уведомлений по языкам, чатам и подпискам.
+    Шаблоны компилируются один раз при регистрации, готовые тексты
+    кэшируются по (домашка, статус, язык, шаблон подписки).
+    """
+
+    def __init__(self, verdicts, default_locale='ru', cache_size=4096):
+        self.default_locale = default_locale
+        self._verdicts = dict(VERDICTS)
+        self._verdicts[default_locale] = verdicts
+        self._compiled = {
+            locale: compile_template(template)
+            for locale, template in STATUS_CHANGED.items()
+        }
+        self._chat_locales = {}
+        self._custom = {}
+        self.render = functools.lru_cache(cache_size)(self._render)
+
+    def set_locale(self, chat_id, locale):
+        """Язык уведомлений для чата."""
+        if locale not in self._compiled:
+            raise ValueError(f'Нет шаблонов для языка {locale}')
+        self._chat_locales[str(chat_id)] = locale
+        self.render.cache_clear()
+
+    def set_template(self, tenant_key, template):
+        """Собственный шаблон уведомления для подписки."""
+        self._custom[tenant_key] = compile_template(template)
+        self.render.cache_clear()
+
+    def locale_for(self, chat_id):
+        """Язык уведомлений для чата."""
+        return self._chat_locales.get(str(chat_id), self.default_locale)
+
+    def _render(self, homework_name, status, locale, tenant_key=None):
+        template = self._custom.get(tenant_key) or self._compiled[locale]
+        verdicts = self._verdicts.get(
+            locale, self._verdicts[self.default_locale])
+        return template(homework_name=homework_name, verdict=verdicts[status])
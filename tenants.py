@@ -0,0 +1,165 @@
+import enum
+import hashlib
+import json
+import threading
+import time
+
+
+def tenant_key(token):
+    """Стабильный идентификатор подписки, не раскрывающий токен."""
+    return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+
+class Status(enum.IntEnum):
+    """Код статуса домашки - ключа HOMEWORK_VERDICTS."""
+
+    APPROVED = 1
+    REVIEWING = 2
+    REJECTED = 3
+
+    @classmethod
+    def parse(cls, name):
+        """Код по статусу из ответа API."""
+        return cls[name.upper()]
+
+
+class Tenant:
+    """Подписка: токен Практикума, чат Telegram и курсор опроса.
+    Статусы хранятся кодами Status, а словарь статусов домашек
+    заводится только после первого изменения.
+    """
+
+    __slots__ = (
+        'token', 'key', 'chat_id', 'from_date', 'statuses', 'status',
+        'changed_at', 'next_poll')
+
+    def __init__(self, token, chat_id, from_date=None):
+        self.token = token
+        self.key = tenant_key(token)
+        self.chat_id = chat_id
+        self.from_date = int(time.time()) if from_date is None else from_date
+        self.statuses = None
+        self.status = None
+        self.changed_at = time.time()
+        self.next_poll = 0
+
+    def status_of(self, homework_key):
+        """Запомненный код статуса домашки или None."""
+        if self.statuses is None:
+            return None
+        return self.statuses.get(homework_key)
+
+    def update_statuses(self, changes):
+        """Запоминает новые статусы домашек.
+        status - сводный статус подписки для планировщика: REVIEWING,
+        если хоть одна работа на проверке, иначе последний изменившийся.
+        """
+        if self.statuses is None:
+            self.statuses = {}
+        self.statuses.update(changes)
+        if Status.REVIEWING in self.statuses.values():
+            self.status = Status.REVIEWING
+        else:
+            self.status = list(changes.values())[-1]
+        self.changed_at = time.time()
+
+    def __repr__(self):
+        return f'Tenant(chat_id={self.chat_id!r})'
+
+
+class TenantRegistry:
+    """Реестр подписок: токен -> чат -> курсор.
+    Подписку можно найти и по токену, и по его отпечатку key.
+    Подписки, добавленные вручную (через API управления),
+    не входят в файл подписок и переживают sync().
+    """
+
+    def __init__(self):
+        self._tenants = {}
+        self._keys = {}
+        self._manual = set()
+        self._lock = threading.Lock()
+
+    def add(self, tenant, manual=False):
+        """Добавляет подписку или заменяет подписку с тем же токеном."""
+        with self._lock:
+            self._tenants[tenant.token] = tenant
+            self._keys[tenant.key] = tenant
+            if manual:
+                self._manual.add(tenant.token)
+
+    def remove(self, token):
+        """Удаляет подписку, возвращает её или None."""
+        with self._lock:
+            tenant = self._tenants.pop(token, None)
+            self._manual.discard(token)
+            if tenant is not None:
+                del self._keys[tenant.key]
+            return tenant
+
+    def sync(self, registry):
+        """Приводит реестр к составу registry.
+        Оставшиеся подписки сохраняют состояние и получают новый чат,
+        отсутствующие в registry удаляются, кроме добавленных вручную.
+        Ручная подписка, появившаяся в registry, дальше следует ему.
+        Возвращает добавленные.
+        """
+        fresh = {tenant.token: tenant for tenant in registry}
+        added = []
+        with self._lock:
+            self._manual -= fresh.keys()
+            for token in list(self._tenants):
+                if token not in fresh and token not in self._manual:
+                    del self._keys[self._tenants.pop(token).key]
+            for token, tenant in fresh.items():
+                current = self._tenants.get(token)
+                if current is None:
+                    self._tenants[token] = tenant
+                    self._keys[tenant.key] = tenant
+                    added.append(tenant)
+                else:
+                    current.chat_id = tenant.chat_id
+        return added
+
+    def is_manual(self, token):
+        """Добавлена ли подписка вручную."""
+        return token in self._manual
+
+    def get(self, token):
+        """Возвращает подписку по токену или None."""
+        return self._tenants.get(token)
+
+    def by_key(self, key):
+        """Возвращает подписку по отпечатку токена или None."""
+        return self._keys.get(key)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._tenants.values()))
+
+    def __len__(self):
+        return len(self._tenants)
+
+
+def load_tenants(path=None, token=None, chat_id=None, templates=None):
+    """Собирает реестр подписок.
+    Из JSON-файла со списком {"token": ..., "chat_id": ...},
+    а если файл не задан - из одной пары токен/чат.
+    Необязательное поле "from_date" задаёт начальный курсор
+    (0 - вся история), "locale" и "template" передаются
+    в реестр шаблонов templates.
+    """
+    registry = TenantRegistry()
+    if path:
+        with open(path, encoding='utf-8') as file:
+            for item in json.load(file):
+                tenant = Tenant(
+                    item['token'], item['chat_id'], item.get('from_date'))
+                registry.add(tenant)
+                if templates is not None and 'locale' in item:
+                    templates.set_locale(tenant.chat_id, item['locale'])
+                if templates is not None and 'template' in item:
+                    templates.set_template(tenant.key, item['template'])
+    elif token and chat_id:
+        registry.add(Tenant(token, chat_id))
+    return registry
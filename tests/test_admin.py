@@ -0,0 +1,168 @@
+import json
+import socket
+from http.client import HTTPConnection
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+from admin import shard_address, start_admin_server
+from scheduler import Scheduler
+from tenants import Status, Tenant, TenantRegistry, tenant_key
+
+
+class UnixConnection(HTTPConnection):
+
+    def __init__(self, path):
+        super().__init__('localhost')
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+class TestAdmin:
+
+    @pytest.fixture
+    def scheduler(self):
+        registry = TenantRegistry()
+        tenant = Tenant('token', 42, from_date=10)
+        tenant.update_statuses({'1': Status.REVIEWING})
+        registry.add(tenant)
+        scheduler = Scheduler(registry, lambda tenant: None, 600, 2)
+        scheduler.server = start_admin_server('127.0.0.1:0', scheduler)
+        yield scheduler
+        scheduler.server.shutdown()
+        scheduler.server.server_close()
+
+    def call(self, scheduler, method, path, payload=None):
+        port = scheduler.server.server_address[1]
+        request = Request(
+            f'http://127.0.0.1:{port}{path}', method=method,
+            data=None if payload is None else json.dumps(payload).encode())
+        try:
+            with urlopen(request) as response:
+                return response.status, json.loads(response.read())
+        except HTTPError as error:
+            return error.code, None
+
+    def test_inspect_tenants(self, scheduler):
+        key = tenant_key('token')
+        status, tenants = self.call(scheduler, 'GET', '/tenants')
+        assert status == 200 and [t['key'] for t in tenants] == [key]
+        assert 'token' not in json.dumps(tenants), (
+            'API управления не должно раскрывать токены'
+        )
+        status, tenant = self.call(scheduler, 'GET', f'/tenants/{key}')
+        assert tenant['from_date'] == 10 and tenant['status'] == 'reviewing'
+        assert tenant['statuses'] == {'1': 'reviewing'}
+        assert self.call(scheduler, 'GET', '/tenants/unknown')[0] == 404
+
+    def test_add_and_remove_applied_by_scheduler(self, scheduler):
+        status, body = self.call(
+            scheduler, 'POST', '/tenants', {'token': 'new', 'chat_id': 7})
+        assert status == 201 and body['key'] == tenant_key('new')
+        assert scheduler.registry.get('new') is None, (
+            'Изменения должен применять поток планировщика'
+        )
+        scheduler.wait(0)
+        assert scheduler.registry.get('new').chat_id == 7
+        scheduler.reload(TenantRegistry())
+        assert scheduler.registry.get('new') is not None, (
+            'Подписка из API должна пережить перечитывание файла подписок'
+        )
+        assert scheduler.registry.get('token') is None
+        assert self.call(
+            scheduler, 'POST', '/tenants', {'token': 'new', 'chat_id': 7}
+        )[0] == 409
+        assert self.call(
+            scheduler, 'POST', '/tenants', {'chat_id': 7})[0] == 400
+        assert self.call(
+            scheduler, 'DELETE', f'/tenants/{body["key"]}')[0] == 202
+        scheduler.wait(0)
+        assert scheduler.registry.get('new') is None
+
+    def test_create_validates_fields(self, scheduler):
+        for payload in (
+            {'token': 1, 'chat_id': 7},
+            {'token': 'new', 'chat_id': [7]},
+            {'token': 'new', 'chat_id': True},
+            {'token': 'new', 'chat_id': 7, 'from_date': 'вчера'},
+            {'token': 'new', 'chat_id': 7, 'from_date': -1},
+            ['new', 7],
+        ):
+            assert self.call(scheduler, 'POST', '/tenants', payload)[0] == (
+                400), f'Запрос {payload} должен отклоняться'
+        port = scheduler.server.server_address[1]
+        for headers, code in (
+            ({}, 411),
+            ({'Content-Length': '-1'}, 400),
+            ({'Content-Length': 'abc'}, 400),
+        ):
+            connection = HTTPConnection('127.0.0.1', port)
+            connection.putrequest('POST', '/tenants')
+            for name, value in headers.items():
+                connection.putheader(name, value)
+            connection.endheaders()
+            assert connection.getresponse().status == code
+            connection.close()
+        scheduler.wait(0)
+        assert len(scheduler.registry) == 1
+
+    def test_create_rejects_foreign_tenant(self, scheduler):
+        scheduler.server.RequestHandlerClass.owns = staticmethod(
+            lambda tenant: tenant.token != 'foreign')
+        assert self.call(
+            scheduler, 'POST', '/tenants',
+            {'token': 'foreign', 'chat_id': 7})[0] == 421, (
+            'Подписку другого воркера нельзя добавлять в этот'
+        )
+        assert self.call(
+            scheduler, 'POST', '/tenants',
+            {'token': 'own', 'chat_id': 7})[0] == 201
+
+    def test_pause_resume_and_poll(self, scheduler):
+        tenant = scheduler.registry.get('token')
+        path = f'/tenants/{tenant.key}'
+        assert scheduler.due() == [tenant]
+        scheduler.finish(tenant)
+        assert self.call(scheduler, 'POST', f'{path}/pause')[0] == 202
+        assert self.call(scheduler, 'POST', f'{path}/poll')[0] == 202
+        scheduler.wait(0)
+        assert scheduler.due() == [], 'Подписка на паузе не опрашивается'
+        assert self.call(scheduler, 'POST', f'{path}/resume')[0] == 202
+        scheduler.wait(0)
+        assert scheduler.due() == [tenant], (
+            'После возобновления подписка опрашивается сразу'
+        )
+        assert self.call(scheduler, 'POST', f'{path}/poll')[0] == 202
+        scheduler.wait(0)
+        assert scheduler.due() == [], (
+            'Подписку нельзя опрашивать, пока не закончен текущий опрос'
+        )
+        scheduler.finish(tenant)
+        assert scheduler.due() == [tenant], (
+            'Запрошенный опрос должен начаться сразу после текущего'
+        )
+        assert self.call(scheduler, 'POST', f'{path}/unknown')[0] == 404
+
+    def test_unix_socket(self, tmp_path):
+        path = str(tmp_path / 'admin.sock')
+        scheduler = Scheduler(TenantRegistry(), lambda tenant: None, 600, 2)
+        server = start_admin_server(path, scheduler)
+        try:
+            connection = UnixConnection(path)
+            connection.request('GET', '/tenants')
+            response = connection.getresponse()
+            assert response.status == 200
+            assert json.loads(response.read()) == []
+            connection.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_shard_address(self):
+        assert shard_address('8080', 2) == 8082
+        assert shard_address('0.0.0.0:8080', 1) == '0.0.0.0:8081'
+        assert shard_address('/run/bot.sock', 1) == '/run/bot.sock.1'
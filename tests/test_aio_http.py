@@ -0,0 +1,133 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from aio_http import AsyncHTTPClient, RequestError
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path.startswith('/chunked'):
+            self.send_response(200)
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for chunk in (b'{"a": ', b'1}'):
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            self.wfile.write(b'0\r\n\r\n')
+            return
+        if self.path.startswith('/slow'):
+            self.server.release.wait(5)
+        body = json.dumps({'path': self.path}).encode()
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Length', str(len(body)))
+        if self.path.startswith('/close'):
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        data = self.rfile.read(int(self.headers['Content-Length']))
+        body = json.dumps({'echo': json.loads(data)}).encode()
+        self.send_response(201)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestAsyncHTTPClient:
+
+    @pytest.fixture
+    def server(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        server.daemon_threads = True
+        server.release = threading.Event()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        server.url = f'http://127.0.0.1:{server.server_address[1]}'
+        yield server
+        server.release.set()
+        server.shutdown()
+        server.server_close()
+
+    def run(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def test_keep_alive_reused(self, server):
+        async def scenario():
+            client = AsyncHTTPClient(pool_size=2)
+            responses = [
+                await client.get(
+                    f'{server.url}/x', params={'from_date': index})
+                for index in range(3)
+            ]
+            await client.close()
+            return client, responses
+
+        client, responses = self.run(scenario())
+        assert [response.json() for response in responses] == [
+            {'path': f'/x?from_date={index}'} for index in range(3)]
+        assert responses[0].headers.get('etag') == '"v1"'
+        assert client.connections == 1, (
+            'Запросы подряд должны идти по одному keep-alive соединению'
+        )
+
+    def test_chunked_and_post(self, server):
+        async def scenario():
+            client = AsyncHTTPClient()
+            chunked = await client.get(f'{server.url}/chunked')
+            posted = await client.post_json(
+                f'{server.url}/send', {'text': 'привет'})
+            await client.close()
+            return chunked, posted
+
+        chunked, posted = self.run(scenario())
+        assert chunked.json() == {'a': 1}
+        assert posted.status_code == 201
+        assert posted.json() == {'echo': {'text': 'привет'}}
+
+    def test_closed_connection_not_reused(self, server):
+        async def scenario():
+            client = AsyncHTTPClient()
+            await client.get(f'{server.url}/close')
+            await client.get(f'{server.url}/x')
+            await client.close()
+            return client
+
+        assert self.run(scenario()).connections == 2
+
+    def test_pool_limits_connections(self, server):
+        async def scenario():
+            client = AsyncHTTPClient(pool_size=2, timeout=5)
+            slow = [
+                asyncio.ensure_future(client.get(f'{server.url}/slow'))
+                for _ in range(4)]
+            await asyncio.sleep(0.2)
+            opened = client.connections
+            server.release.set()
+            await asyncio.gather(*slow)
+            await client.close()
+            return opened, client.connections
+
+        assert self.run(scenario()) == (2, 2), (
+            'Соединений не должно быть больше pool_size'
+        )
+
+    def test_timeout_and_refused(self, server):
+        async def scenario():
+            client = AsyncHTTPClient(timeout=0.2)
+            with pytest.raises(RequestError):
+                await client.get(f'{server.url}/slow')
+            with pytest.raises(RequestError):
+                await client.get('http://127.0.0.1:1/')
+            await client.close()
+
+        self.run(scenario())
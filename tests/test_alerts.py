@@ -0,0 +1,43 @@
+from alerts import ErrorDigest, fingerprint
+
+
+class TestAlerts:
+
+    def test_fingerprint_ignores_volatile_parts(self):
+        assert fingerprint(ValueError('Код ответа 500')) == fingerprint(
+            ValueError('Код ответа 502')), (
+            'Числа в тексте не должны менять отпечаток ошибки'
+        )
+        assert fingerprint(ValueError('a')) != fingerprint(KeyError('a'))
+
+    def test_repeats_suppressed_within_window(self):
+        digest = ErrorDigest(window=60)
+        assert digest.report(1, ValueError('Код 500'), now=0) == (
+            'Сбой в работе программы: Код 500'
+        )
+        assert digest.report(1, ValueError('Код 502'), now=10) is None, (
+            'Повтор сбоя в пределах окна не должен отправляться'
+        )
+        assert digest.report(2, ValueError('Код 500'), now=10), (
+            'Окно считается отдельно для каждого чата'
+        )
+        assert digest.due(now=30) == []
+
+    def test_digest_after_window(self):
+        digest = ErrorDigest(window=60)
+        digest.report(1, ValueError('Код 500'), now=0)
+        for now in (10, 20, 30):
+            digest.report(1, ValueError('Код 500'), now=now)
+        digests = digest.due(now=60)
+        assert len(digests) == 1 and digests[0][0] == 1
+        assert 'повторился 3 раз' in digests[0][1], (
+            'Сводка должна содержать число повторов'
+        )
+        assert digest.report(1, ValueError('Код 500'), now=70) is None, (
+            'Пока сбой повторяется, о нём сообщают только сводки'
+        )
+        digest.due(now=120)
+        assert digest.due(now=180) == []
+        assert digest.report(1, ValueError('Код 500'), now=190), (
+            'После окна без повторов сбой снова сообщается сразу'
+        )
@@ -0,0 +1,56 @@
+import json
+import logging
+import subprocess
+import sys
+
+from app_logger import JSONFormatter, SamplingFilter
+
+
+def make_record(msg, level=logging.INFO, args=()):
+    return logging.LogRecord('test', level, __file__, 1, msg, args, None)
+
+
+class TestAppLogger:
+
+    def test_json_formatter(self):
+        line = JSONFormatter().format(make_record('Опрос %s', args=(5,)))
+        data = json.loads(line)
+        assert data['message'] == 'Опрос 5', (
+            'Проверьте, что сообщение форматируется в потоке слушателя'
+        )
+        assert data['level'] == 'INFO' and data['name'] == 'test'
+
+    def test_sampling_repeated_info(self):
+        sampler = SamplingFilter(burst=2, window=3600)
+        passed = [
+            sampler.filter(make_record('Бот работает исправно'))
+            for _ in range(5)
+        ]
+        assert passed == [True, True, False, False, False], (
+            'Повторяющиеся INFO-записи должны прореживаться'
+        )
+        assert sampler.filter(make_record('Другое сообщение'))
+        assert all(
+            sampler.filter(make_record('Сбой', logging.ERROR))
+            for _ in range(5)
+        ), 'Ошибки не прореживаются'
+
+    def test_forked_child_logs(self):
+        code = (
+            'import logging, multiprocessing\n'
+            'from app_logger import setup_logging, stop_logging\n'
+            'setup_logging(log_format="text")\n'
+            'def child():\n'
+            '    logging.getLogger("shard").warning("из дочернего")\n'
+            '    stop_logging()\n'
+            'process = multiprocessing.get_context("fork").Process('
+            'target=child)\n'
+            'process.start()\n'
+            'process.join()\n'
+        )
+        output = subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, text=True,
+            check=True).stderr
+        assert 'из дочернего' in output, (
+            'Записи процесса после fork не должны теряться'
+        )
@@ -0,0 +1,107 @@
+from backfill import Backfill
+from storage import SQLiteStateStore, StateStore
+from tenants import Status, Tenant
+
+
+def parse(homework):
+    if homework['status'] not in ('approved', 'reviewing', 'rejected'):
+        raise ValueError(homework['status'])
+    return homework['homework_name'], Status.parse(homework['status'])
+
+
+def key(homework):
+    return str(homework['id'])
+
+
+class FakeHistory:
+
+    def __init__(self, homeworks, current_date=100):
+        self.homeworks = homeworks
+        self.current_date = current_date
+        self.fetched = []
+
+    def __call__(self, tenant):
+        self.fetched.append(tenant.key)
+        if tenant.token == 'broken':
+            raise ConnectionError('сеть недоступна')
+        return FakeStream(self.homeworks, self.current_date)
+
+
+class FakeStream:
+
+    def __init__(self, homeworks, current_date):
+        self.homeworks = homeworks
+        self.current_date = None
+        self._current_date = current_date
+
+    def __iter__(self):
+        yield from self.homeworks
+        self.current_date = self._current_date
+
+
+class TestBackfill:
+    HOMEWORKS = [
+        {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+        {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'},
+        {'id': 3, 'homework_name': 'hw3', 'status': 'unknown'},
+    ]
+
+    def test_seeds_statuses_and_cursor(self):
+        tenant = Tenant('token', 1, from_date=0)
+        loader = Backfill(FakeHistory(self.HOMEWORKS), parse, key, rate=100)
+        assert loader.seed(tenant) == 2
+        assert tenant.statuses == {
+            '1': Status.APPROVED, '2': Status.REVIEWING,
+        }, 'История должна попасть в статусы подписки без неизвестных'
+        assert tenant.from_date == 100, (
+            'Курсор должен встать на current_date ответа'
+        )
+
+    def test_changed_at_from_history(self):
+        tenant = Tenant('token', 1, from_date=0)
+        homeworks = [
+            dict(self.HOMEWORKS[0], date_updated='2020-02-13T14:40:57Z'),
+            dict(self.HOMEWORKS[2], date_updated='2030-01-01T00:00:00Z'),
+            dict(self.HOMEWORKS[0], id=4, date_updated=1500000000),
+        ]
+        Backfill(FakeHistory(homeworks), parse, key, rate=100).seed(tenant)
+        assert tenant.changed_at == 1581604857, (
+            'Время изменения берётся из самой поздней загруженной домашки'
+        )
+        empty = Tenant('empty', 2, from_date=0)
+        changed_at = empty.changed_at
+        Backfill(FakeHistory([]), parse, key, rate=100).seed(empty)
+        assert empty.changed_at == changed_at
+
+    def test_empty_history_marked_loaded(self, tmp_path):
+        tenant = Tenant('token', 1, from_date=0)
+        store = SQLiteStateStore(str(tmp_path / 'state.db'))
+        Backfill(FakeHistory([]), parse, key, rate=100).run([tenant], store)
+        assert tenant.statuses == {}, (
+            'Подписка без домашек тоже должна считаться загруженной'
+        )
+        restored = Tenant('token', 1)
+        store.restore([restored])
+        assert restored.statuses == {}
+        fresh = Tenant('other', 2)
+        store.save(fresh)
+        store.flush()
+        store.restore([fresh])
+        assert fresh.statuses is None, (
+            'Подписка без загруженной истории остаётся без словаря статусов'
+        )
+        store.close()
+
+    def test_run_saves_tenants_and_skips_failures(self):
+        tenants = [Tenant('token', 1, from_date=0),
+                   Tenant('broken', 2, from_date=0)]
+        store = StateStore()
+        history = FakeHistory(self.HOMEWORKS)
+        seeded = Backfill(history, parse, key, workers=2, rate=100).run(
+            tenants, store)
+        assert seeded == 1, 'Сбой одной подписки не должен прерывать загрузку'
+        assert sorted(history.fetched) == sorted(t.key for t in tenants)
+        assert store.load(tenants[0].key) is not None, (
+            'Загруженная история должна сохраняться в хранилище'
+        )
+        assert store.load(tenants[1].key) is None
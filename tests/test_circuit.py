@@ -0,0 +1,114 @@
+import pytest
+import requests
+
+from circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakers
+from exceptions import CircuitOpen, ResponseStatusCodeNoneOk
+from tenants import Tenant
+
+
+class TestCircuit:
+
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker('api', threshold=2, delay=10)
+        breaker.record_failure(now=100)
+        assert breaker.state == CLOSED
+        breaker.record_failure(now=100)
+        assert breaker.state == OPEN, (
+            'Проверьте, что предохранитель размыкается после серии сбоев'
+        )
+        assert not breaker.allow(now=105)
+        assert breaker.retry_in(now=105) == 5
+
+    def test_half_open_probe(self):
+        breaker = CircuitBreaker('api', threshold=1, delay=10, max_delay=15)
+        breaker.record_failure(now=100)
+        assert breaker.allow(now=110)
+        assert breaker.state == HALF_OPEN
+        assert not breaker.allow(now=110), (
+            'В полуоткрытом состоянии пропускается только одна проба'
+        )
+        breaker.record_failure(now=110)
+        assert breaker.reopen_at == 125, (
+            'Неудачная проба должна удваивать паузу в пределах max_delay'
+        )
+        assert breaker.allow(now=125)
+        breaker.record_success()
+        assert breaker.state == CLOSED and breaker.allow(now=125)
+
+    def test_lost_probe_released(self):
+        breaker = CircuitBreaker('api', threshold=1, delay=10)
+        breaker.record_failure(now=100)
+        assert breaker.allow(now=110)
+        assert not breaker.allow(now=115)
+        assert breaker.retry_in(now=115) == 5
+        assert breaker.allow(now=120), (
+            'Проба без исхода не должна держать предохранитель вечно'
+        )
+
+    def test_tenant_error_closes_endpoint(self):
+        breakers = CircuitBreakers('api', threshold=1, delay=10)
+        first, second = Tenant('a', 1), Tenant('b', 2)
+        breakers.record_failure(first, requests.ConnectionError())
+        breakers.endpoint.reopen_at = 0
+        assert breakers.allow(first)
+        assert breakers.endpoint.state == HALF_OPEN
+        breakers.record_failure(
+            first, ResponseStatusCodeNoneOk('401', status_code=401))
+        assert breakers.endpoint.state == CLOSED, (
+            'Ответ 4xx на пробу доказывает, что эндпоинт доступен'
+        )
+        assert breakers.allow(second)
+
+    def test_endpoint_refusal_keeps_tenant_probe(self):
+        breakers = CircuitBreakers('api', threshold=1, delay=10)
+        tenant = Tenant('a', 1)
+        breakers.record_failure(
+            tenant, ResponseStatusCodeNoneOk('401', status_code=401))
+        breakers.record_failure(tenant, requests.ConnectionError())
+        breaker = breakers._tenants[tenant.key]
+        breaker.reopen_at = 0
+        assert not breakers.allow(tenant)
+        assert breaker.state == OPEN, (
+            'Отказ эндпоинта не должен расходовать пробу подписки'
+        )
+        breakers.endpoint.reopen_at = 0
+        assert breakers.allow(tenant)
+
+    def test_endpoint_breaker_shared(self):
+        breakers = CircuitBreakers('api', threshold=1, delay=10)
+        first, second = Tenant('a', 1), Tenant('b', 2)
+        breakers.record_failure(first, requests.ConnectionError())
+        assert not breakers.allow(second), (
+            'Сбой эндпоинта должен притормаживать все подписки'
+        )
+
+    def test_tenant_breaker_isolated(self):
+        breakers = CircuitBreakers('api', threshold=1, delay=10)
+        first, second = Tenant('a', 1), Tenant('b', 2)
+        breakers.record_failure(
+            first, ResponseStatusCodeNoneOk('401', status_code=401))
+        assert not breakers.allow(first)
+        assert breakers.allow(second), (
+            'Сбой токена не должен мешать опросу других подписок'
+        )
+
+    def test_guarded_answer(self):
+        import homework
+
+        class FailingSession:
+            calls = 0
+
+            def get(self, *args, **kwargs):
+                self.calls += 1
+                raise requests.ConnectionError('down')
+
+        session = FailingSession()
+        breakers = CircuitBreakers('api', threshold=1, delay=60)
+        tenant = Tenant('a', 1)
+        with pytest.raises(requests.ConnectionError):
+            homework.get_guarded_answer(tenant, session, None, breakers)
+        with pytest.raises(CircuitOpen):
+            homework.get_guarded_answer(tenant, session, None, breakers)
+        assert session.calls == 1, (
+            'При разомкнутом предохранителе запрос к API не отправляется'
+        )
@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+
+from benchmarks.bench_import import HEAVY_MODULES
+
+
+class TestImports:
+
+    def test_heavy_clients_imported_lazily(self):
+        code = (
+            'import sys, homework; '
+            f'print(",".join(m for m in {HEAVY_MODULES!r} '
+            'if m in sys.modules))'
+        )
+        output = subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True, text=True, check=True).stdout
+        assert output.strip() == '', (
+            'Импорт homework не должен подгружать клиенты Telegram и HTTP'
+        )
@@ -0,0 +1,53 @@
+from urllib.request import urlopen
+
+import pytest
+
+from metrics import (
+    REGISTRY, Histogram, Registry, start_metrics_server, timed)
+
+
+class TestMetrics:
+
+    def test_timed_counts_calls_and_errors(self):
+        @timed('test_func')
+        def func(fail=False):
+            if fail:
+                raise ValueError('boom')
+            return 1
+
+        assert func() == 1
+        with pytest.raises(ValueError):
+            func(fail=True)
+        text = REGISTRY.expose()
+        assert 'homework_bot_test_func_calls_total 2' in text, (
+            'Проверьте подсчёт вызовов'
+        )
+        assert 'homework_bot_test_func_errors_total 1' in text, (
+            'Проверьте подсчёт ошибок'
+        )
+        assert 'homework_bot_test_func_seconds_count 2' in text
+
+    def test_histogram_buckets(self):
+        histogram = Histogram('latency', 'help', buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 5):
+            histogram.observe(value)
+        lines = histogram.expose()
+        assert 'latency_bucket{le="0.1"} 2' in lines
+        assert 'latency_bucket{le="1"} 3' in lines
+        assert 'latency_bucket{le="+Inf"} 4' in lines
+        assert 'latency_count 4' in lines
+
+    def test_metrics_endpoint(self):
+        registry = Registry('test')
+        registry.gauge('depth', 'Глубина', lambda: 7)
+        server = start_metrics_server(0, registry=registry)
+        try:
+            port = server.server_address[1]
+            with urlopen(f'http://127.0.0.1:{port}/metrics') as response:
+                body = response.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert 'test_depth 7' in body, (
+            'Проверьте, что метрики отдаются по HTTP'
+        )
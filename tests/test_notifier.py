@@ -0,0 +1,245 @@
+import threading
+import time
+
+from telegram.error import BadRequest, TimedOut
+
+from exceptions import ErrorSendingMessage
+from notifier import SendQueue, TokenBucket
+from storage import OutboxStore
+
+
+class TestNotifier:
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=2, capacity=1)
+        now = bucket.updated
+        assert bucket.wait_time(now) == 0
+        bucket.take()
+        assert bucket.wait_time(now) == 0.5, (
+            'Проверьте, что токен восстанавливается со скоростью rate'
+        )
+        assert bucket.wait_time(now + 0.5) == 0
+
+    def test_pending_messages_coalesced(self):
+        sent = []
+        queue = SendQueue(lambda chat_id, text: sent.append((chat_id, text)))
+        queue.put(1, 'first')
+        queue.put(1, 'second')
+        queue.put(1, 'first')
+        queue.put(2, 'other')
+        assert len(queue) == 3, 'Повтор одного текста должен склеиваться'
+        queue.start()
+        assert queue.drain(timeout=5)
+        queue.stop()
+        assert sorted(sent) == [(1, 'first\n\nsecond'), (2, 'other')], (
+            'Проверьте, что сообщения одного чата уходят одной отправкой'
+        )
+
+    def test_transient_error_retried(self):
+        attempts = []
+
+        def send(chat_id, text):
+            attempts.append(text)
+            if len(attempts) == 1:
+                raise ErrorSendingMessage('timeout') from TimedOut()
+
+        queue = SendQueue(send, chat_rate=1000, backoff=0.01)
+        queue.put(1, 'text')
+        queue.start()
+        assert queue.drain(timeout=5)
+        queue.stop()
+        assert attempts == ['text', 'text'], (
+            'Проверьте, что при временном сбое отправка повторяется'
+        )
+
+    def test_transient_error_never_dropped(self):
+        attempts = []
+        outbox = OutboxStore()
+
+        def send(chat_id, text):
+            attempts.append(text)
+            if len(attempts) <= 5:
+                assert outbox.pending() == [(1, 'text')], (
+                    'До отправки уведомление должно оставаться в журнале'
+                )
+                raise ErrorSendingMessage('timeout') from TimedOut()
+
+        queue = SendQueue(
+            send, chat_rate=1000, retries=2, backoff=0.01,
+            max_backoff=0.02, outbox=outbox, key=lambda item: item)
+        queue.put(1, 'text')
+        queue.start()
+        assert queue.drain(timeout=5)
+        queue.stop()
+        assert len(attempts) == 6, (
+            'После retries попыток временный сбой всё равно повторяется'
+        )
+        assert outbox.pending() == []
+
+    def test_permanent_error_dropped(self):
+        attempts = []
+
+        def send(chat_id, text):
+            attempts.append(text)
+            raise ErrorSendingMessage('bad') from BadRequest('bad')
+
+        queue = SendQueue(send, chat_rate=1000, backoff=0.01)
+        queue.put(1, 'text')
+        queue.start()
+        assert queue.drain(timeout=5)
+        time.sleep(0.05)
+        queue.stop()
+        assert attempts == ['text'], (
+            'Постоянные ошибки Telegram не должны повторяться'
+        )
+
+    def test_items_rendered_on_send(self):
+        rendered = []
+        sent = []
+
+        def render(chat_id, item):
+            rendered.append(item)
+            return f'<{item}>'
+
+        queue = SendQueue(
+            lambda chat_id, text: sent.append(text), render=render)
+        queue.put(1, 'a')
+        queue.put(1, 'b')
+        assert rendered == [], 'Текст должен строиться только при отправке'
+        queue.start()
+        assert queue.drain(timeout=5)
+        queue.stop()
+        assert sent == ['<a>\n\n<b>']
+
+    def test_outbox_delivers_once(self):
+        sent = []
+        outbox = OutboxStore()
+        queue = SendQueue(
+            lambda chat_id, text: sent.append(text),
+            outbox=outbox, key=lambda item: item)
+        queue.put(1, 'a')
+        queue.start()
+        assert queue.drain(timeout=5)
+        queue.put(1, 'a')
+        assert queue.drain(timeout=5)
+        queue.stop()
+        assert sent == ['a'], (
+            'Уведомление с тем же ключом не должно отправляться повторно'
+        )
+        assert outbox.pending() == []
+
+    def test_outbox_restored_after_restart(self):
+        outbox = OutboxStore()
+        crashed = SendQueue(
+            lambda chat_id, text: None, outbox=outbox, key=lambda item: item)
+        crashed.put(1, 'a')
+        sent = []
+        queue = SendQueue(
+            lambda chat_id, text: sent.append((chat_id, text)),
+            outbox=outbox, key=lambda item: item)
+        assert queue.restore() == 1
+        queue.start()
+        assert queue.drain(timeout=5)
+        queue.stop()
+        assert sent == [(1, 'a')], (
+            'Недоставленные уведомления должны уйти после перезапуска'
+        )
+        assert outbox.pending() == []
+
+    def test_outbox_restored_per_shard(self):
+        outbox = OutboxStore()
+        crashed = SendQueue(
+            lambda chat_id, text: None, outbox=outbox,
+            key=lambda item: item, owner=lambda item: item[0])
+        crashed.put(1, 'a1')
+        crashed.put(2, 'b1')
+        shards = [
+            SendQueue(lambda chat_id, text: None, outbox=outbox,
+                      key=lambda item: item)
+            for _ in range(2)
+        ]
+        restored = [
+            shard.restore(lambda tenant, owned=owned: tenant == owned)
+            for shard, owned in zip(shards, 'ab')
+        ]
+        assert restored == [1, 1], (
+            'Каждое уведомление после перезапуска поднимает один воркер'
+        )
+
+    def test_workers_keep_chat_order(self):
+        active = set()
+        sent = []
+        overlaps = []
+
+        def send(chat_id, text):
+            if chat_id in active:
+                overlaps.append(chat_id)
+            active.add(chat_id)
+            time.sleep(0.01)
+            sent.append((chat_id, text))
+            active.discard(chat_id)
+
+        queue = SendQueue(send, chat_rate=1000, global_rate=1000, workers=4)
+        queue.start()
+        for index in range(20):
+            queue.put(index % 3, f'text-{index}')
+            time.sleep(0.002)
+        assert queue.drain(timeout=5)
+        queue.stop()
+        assert overlaps == [], (
+            'В один чат не должны отправлять несколько потоков сразу'
+        )
+        delivered = '\n\n'.join(text for chat_id, text in sent if chat_id == 0)
+        assert delivered.split('\n\n') == [
+            f'text-{index}' for index in range(0, 20, 3)]
+
+    def test_busy_chat_does_not_spin(self):
+        release = threading.Event()
+        sent = []
+
+        def send(chat_id, text):
+            release.wait(5)
+            sent.append(text)
+
+        queue = SendQueue(send, chat_rate=1000, global_rate=1000, workers=2)
+        picks = []
+        pick = queue._pick
+        queue._pick = lambda now: picks.append(now) or pick(now)
+        queue.start()
+        queue.put(1, 'first')
+        time.sleep(0.05)
+        queue.put(1, 'second')
+        time.sleep(0.2)
+        assert len(picks) < 20, (
+            'Пока чат занят отправкой, второй поток не должен крутиться'
+        )
+        release.set()
+        assert queue.drain(timeout=5)
+        queue.stop()
+        assert sent == ['first', 'second']
+
+    def test_render_error_does_not_kill_sender(self):
+        sent = []
+        outbox = OutboxStore()
+
+        def render(chat_id, item):
+            if item == 'bad':
+                raise ValueError('битый шаблон')
+            return item
+
+        queue = SendQueue(
+            lambda chat_id, text: sent.append(text), chat_rate=1000,
+            render=render, outbox=outbox, key=lambda item: item)
+        queue.start()
+        queue.put(1, 'bad')
+        queue.put(1, 'good')
+        assert queue.drain(timeout=5)
+        queue.put(1, 'later')
+        assert queue.drain(timeout=5), (
+            'Ошибка сборки текста не должна останавливать поток отправки'
+        )
+        queue.stop()
+        assert 'bad' not in ' '.join(sent) and 'later' in ' '.join(sent)
+        assert outbox.pending() == [], (
+            'Несобираемое уведомление должно сниматься с журнала'
+        )
@@ -0,0 +1,204 @@
+import asyncio
+import json
+import os
+import signal
+import sys
+import threading
+from http import HTTPStatus
+
+import pytest
+
+from api_cache import ResponseCache
+from tenants import Status, Tenant, TenantRegistry
+
+
+class FakeResponse:
+
+    def __init__(self, data, status_code=HTTPStatus.OK, headers=None):
+        self.data = data
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = json.dumps(data).encode()
+
+    def json(self):
+        return self.data
+
+
+class FakeSession:
+
+    def __init__(self, data):
+        self.data = data
+        self.calls = []
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        self.calls.append((headers, params))
+        return FakeResponse(self.data)
+
+
+class FakeAsyncSession(FakeSession):
+
+    async def get(self, url, headers=None, params=None):
+        return super().get(url, headers, params)
+
+
+class FakeNotifier:
+
+    def __init__(self):
+        self.sent = []
+
+    def put(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+
+class TestPolling:
+    RESPONSE = {
+        'homeworks': [{'homework_name': 'hw1', 'status': 'approved'}],
+        'current_date': 1000,
+    }
+
+    def test_poll_tenant_uses_session(self):
+        import homework
+
+        session = FakeSession(self.RESPONSE)
+        notifier = FakeNotifier()
+        tenant = Tenant('token', 42, from_date=10)
+        homework.poll_tenant(notifier, tenant, session)
+        assert session.calls == [
+            ({'Authorization': 'OAuth token'}, {'from_date': 10})
+        ], 'Проверьте, что запрос идет через переданную сессию'
+        assert len(notifier.sent) == 1 and notifier.sent[0][0] == 42
+        assert tenant.from_date == 1000, (
+            'Проверьте, что после отправки курсор сдвигается'
+        )
+        homework.poll_tenant(notifier, tenant, session)
+        assert len(notifier.sent) == 1, (
+            'Проверьте, что неизменившийся статус не отправляется повторно'
+        )
+
+    def test_async_poll_tenant(self):
+        import homework
+
+        session = FakeAsyncSession(self.RESPONSE)
+        notifier = FakeNotifier()
+        tenant = Tenant('token', 42, from_date=10)
+        cache = ResponseCache()
+        asyncio.run(
+            homework.async_poll_tenant(notifier, tenant, session, cache))
+        assert session.calls == [
+            ({'Authorization': 'OAuth token'}, {'from_date': 10})]
+        assert notifier.sent and homework.render_notice(
+            *notifier.sent[0]).startswith(
+            'Изменился статус проверки работы "hw1"'
+        ), 'Проверьте асинхронный опрос подписки'
+        assert tenant.from_date == 1000
+
+    def test_telegram_errors_mapped(self):
+        import telegram.error
+
+        import homework
+
+        homework.check_telegram_answer(FakeResponse({'ok': True}))
+        for status, data, error in (
+            (429, {'parameters': {'retry_after': 3}},
+             telegram.error.RetryAfter),
+            (400, {'description': 'chat not found'},
+             telegram.error.BadRequest),
+            (403, {'description': 'blocked'}, telegram.error.Unauthorized),
+            (502, {}, telegram.error.NetworkError),
+        ):
+            response = FakeResponse({'ok': False, **data}, status)
+            with pytest.raises(telegram.error.TelegramError) as raised:
+                homework.check_telegram_answer(response)
+            assert raised.type is error, (
+                f'Ответ {status} должен давать {error.__name__}'
+            )
+
+    def test_all_homeworks_processed(self):
+        import homework
+
+        session = FakeSession({
+            'homeworks': [
+                {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+                {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'},
+            ],
+            'current_date': 1000,
+        })
+        notifier = FakeNotifier()
+        tenant = Tenant('token', 42, from_date=10)
+        tenant.statuses = {'1': Status.APPROVED}
+        homework.poll_tenant(notifier, tenant, session)
+        assert [
+            (chat_id, notice[:3]) for chat_id, notice in notifier.sent
+        ] == [(42, ('hw2', Status.REVIEWING, tenant.key))], (
+            'Проверьте, что в уведомления попадают только изменившиеся работы'
+        )
+        assert tenant.statuses == {'1': Status.APPROVED, '2': Status.REVIEWING}
+        assert tenant.status == Status.REVIEWING
+
+    def test_unchanged_response_skipped(self):
+        import homework
+
+        session = FakeSession(self.RESPONSE)
+        notifier = FakeNotifier()
+        cache = ResponseCache()
+        tenant = Tenant('token', 42, from_date=10)
+        homework.poll_tenant(notifier, tenant, session, cache)
+        tenant.statuses.clear()
+        session.data = dict(self.RESPONSE, current_date=2000)
+        homework.poll_tenant(notifier, tenant, session, cache)
+        assert len(notifier.sent) == 1, (
+            'Проверьте, что неизменившийся ответ API не разбирается повторно'
+        )
+        assert tenant.from_date == 1000
+
+    def test_cache_lru_eviction(self):
+        cache = ResponseCache(max_size=2)
+        response = FakeResponse(self.RESPONSE, headers={'ETag': '"v1"'})
+        for key in ('a', 'b', 'c'):
+            assert cache.update(key, response)
+        assert len(cache) == 2, 'Проверьте, что размер кэша ограничен'
+        assert cache.conditional_headers('a') == {}
+        assert cache.conditional_headers('c') == {'If-None-Match': '"v1"'}
+
+    def test_push_mode_reloads_outside_signal_handler(self, monkeypatch):
+        import homework
+
+        registry = TenantRegistry()
+        registry.add(Tenant('old', 1))
+        fresh = TenantRegistry()
+        fresh.add(Tenant('new', 2))
+        reloaded = threading.Event()
+        callers = []
+
+        def reload_tenants(store):
+            callers.append(sys._getframe(1).f_code.co_name)
+            reloaded.set()
+            return fresh
+
+        def send_signals():
+            os.kill(os.getpid(), signal.SIGHUP)
+            reloaded.wait(5)
+            os.kill(os.getpid(), signal.SIGTERM)
+
+        def handle_signals(stop, reload):
+            handle(stop, reload)
+            threading.Thread(target=send_signals).start()
+
+        handle = homework.handle_signals
+        monkeypatch.setattr(homework, 'reload_tenants', reload_tenants)
+        monkeypatch.setattr(homework, 'handle_signals', handle_signals)
+        handlers = {
+            signum: signal.getsignal(signum)
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP)
+        }
+        try:
+            homework.wait_for_push(registry, None)
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+        assert [tenant.token for tenant in registry] == ['new'], (
+            'SIGHUP должен перечитывать подписки в режиме push'
+        )
+        assert callers == ['wait_for_push'], (
+            'Подписки должны перечитываться в цикле, а не в обработчике'
+        )
@@ -0,0 +1,246 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from scheduler import AdaptiveInterval, Scheduler
+from tenants import Status, Tenant, TenantRegistry, load_tenants
+
+
+class TestScheduler:
+
+    def test_load_tenants_from_file(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'token': 'a', 'chat_id': 1},
+            {'token': 'b', 'chat_id': 2},
+        ]))
+        registry = load_tenants(str(path))
+        assert len(registry) == 2, (
+            'Проверьте, что все подписки из файла попадают в реестр'
+        )
+        assert registry.get('b').chat_id == 2
+
+    def test_load_single_tenant(self):
+        registry = load_tenants(None, 'token', 12345)
+        assert len(registry) == 1
+        assert load_tenants(None, None, None).get('token') is None
+
+    def test_poll_due_tenants(self):
+        registry = TenantRegistry()
+        for token in ('a', 'b', 'c'):
+            registry.add(Tenant(token, token))
+        polled = []
+        scheduler = Scheduler(registry, polled.append, 600, 2)
+        scheduler.schedule(registry.get('c'), 600)
+        assert {tenant.token for tenant in scheduler.due()} == {'a', 'b'}, (
+            'Проверьте, что опрашиваются только подписки, которым пора'
+        )
+        assert scheduler.due() == []
+
+    def test_poll_error_does_not_stop_others(self):
+        registry = TenantRegistry()
+        registry.add(Tenant('bad', 1))
+        registry.add(Tenant('good', 2))
+        polled = []
+
+        def poll(tenant):
+            if tenant.token == 'bad':
+                raise RuntimeError('boom')
+            polled.append(tenant.token)
+
+        scheduler = Scheduler(registry, poll, 600, 2)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            assert scheduler.submit_due(executor) == 2
+        scheduler.collect()
+        assert polled == ['good'], (
+            'Сбой одной подписки не должен мешать опросу остальных'
+        )
+        assert scheduler.in_flight == 0 and scheduler.running == set(), (
+            'Упавший опрос тоже должен вернуть подписку в очередь'
+        )
+        assert scheduler.due() == []
+
+    def test_adaptive_interval(self):
+        policy = AdaptiveInterval(600, 120, 3600, jitter=0)
+        tenant = Tenant('a', 1)
+        assert policy(tenant, tenant.changed_at) == 600, (
+            'Пока статус неизвестен, используется базовый интервал'
+        )
+        assert policy(tenant, tenant.changed_at + 10 ** 6) == 3600, (
+            'Подписка без работ тоже опрашивается реже со временем'
+        )
+        tenant.status = Status.REVIEWING
+        assert policy(tenant, tenant.changed_at + 10 ** 6) == 120, (
+            'Работу на проверке нужно опрашивать чаще всего'
+        )
+        tenant.status = Status.APPROVED
+        assert policy(tenant, tenant.changed_at + 60) == 120
+        assert policy(tenant, tenant.changed_at + 10 ** 6) == 3600, (
+            'Давно не менявшиеся подписки опрашиваются реже'
+        )
+
+    def test_adaptive_interval_jitter(self):
+        policy = AdaptiveInterval(600, 120, 3600, jitter=0.1)
+        tenant = Tenant('a', 1)
+        delays = {policy(tenant, tenant.changed_at) for _ in range(20)}
+        assert len(delays) > 1
+        assert all(540 <= delay <= 660 for delay in delays)
+        assert all(
+            0 <= policy.initial(tenant) <= 60 for _ in range(20)
+        )
+
+    def test_batch_window(self):
+        registry = TenantRegistry()
+        for token in ('a', 'b', 'c'):
+            registry.add(Tenant(token, token))
+        scheduler = Scheduler(registry, None, 600, 2, batch_window=5)
+        now = time.time()
+        scheduler.schedule(registry.get('b'), 3)
+        scheduler.schedule(registry.get('c'), 60)
+        assert {tenant.token for tenant in scheduler.due(now)} == {
+            'a', 'b'}, (
+            'Подписки со сроком в пределах окна опрашиваются одной пачкой'
+        )
+
+    def test_registry_sync_keeps_state(self):
+        registry = TenantRegistry()
+        kept = Tenant('a', 1)
+        kept.statuses = {'1': Status.APPROVED}
+        registry.add(kept)
+        registry.add(Tenant('b', 2))
+        fresh = TenantRegistry()
+        fresh.add(Tenant('a', 10))
+        fresh.add(Tenant('c', 3))
+        added = registry.sync(fresh)
+        assert [tenant.token for tenant in added] == ['c']
+        assert registry.get('a') is kept, (
+            'Оставшаяся подписка должна сохранить курсор и статусы'
+        )
+        assert kept.chat_id == 10
+        assert registry.get('b') is None
+
+    def test_registry_sync_keeps_manual(self):
+        registry = TenantRegistry()
+        manual = Tenant('a', 1)
+        registry.add(manual, manual=True)
+        registry.add(Tenant('b', 2), manual=True)
+        fresh = TenantRegistry()
+        fresh.add(Tenant('b', 20))
+        assert registry.sync(fresh) == []
+        assert registry.get('a') is manual, (
+            'Подписка, добавленная вручную, не должна сниматься при sync'
+        )
+        assert not registry.is_manual('b'), (
+            'Подписка из файла должна дальше следовать файлу'
+        )
+        registry.sync(TenantRegistry())
+        assert registry.get('b') is None
+        assert registry.get('a') is manual
+
+    def test_reload_between_polls(self):
+        registry = TenantRegistry()
+        registry.add(Tenant('a', 1))
+        scheduler = Scheduler(registry, lambda tenant: None, 600, 2)
+        fresh = TenantRegistry()
+        fresh.add(Tenant('b', 2))
+        scheduler.request_reload(lambda: fresh)
+        assert scheduler.wait(10), 'Перезагрузка не должна останавливать цикл'
+        assert [tenant.token for tenant in scheduler.due()] == ['b'], (
+            'Удалённая подписка должна выпасть из очереди, новая - встать'
+        )
+
+    def test_stop_wakes_loop(self):
+        registry = TenantRegistry()
+        polled = []
+        scheduler = Scheduler(registry, polled.append, 600, 2)
+        thread = threading.Thread(target=scheduler.run_forever)
+        thread.start()
+        started = time.monotonic()
+        scheduler.stop()
+        thread.join(5)
+        assert not thread.is_alive(), 'Остановка должна прерывать ожидание'
+        assert time.monotonic() - started < 5
+
+    def test_pool_backpressure(self):
+        registry = TenantRegistry()
+        for index in range(5):
+            registry.add(Tenant(f'token-{index}', index))
+        release = threading.Event()
+        polled = []
+
+        def poll(tenant):
+            release.wait(5)
+            polled.append(tenant.token)
+
+        scheduler = Scheduler(registry, poll, 600, 2, queue_size=1)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            assert scheduler.submit_due(executor) == 3, (
+                'Пулу нельзя отдавать больше max_workers + queue_size опросов'
+            )
+            assert scheduler.capacity() == 0
+            assert scheduler.submit_due(executor) == 0
+            assert scheduler.due_count() == 2, (
+                'Не поместившиеся подписки должны ждать в очереди'
+            )
+            release.set()
+        scheduler.collect()
+        assert len(polled) == 3
+        assert scheduler.in_flight == 0
+        assert {tenant.token for tenant in scheduler.due()} == {
+            'token-3', 'token-4'}
+
+    def test_due_count_skips_stale_entries(self):
+        registry = TenantRegistry()
+        for index in range(6):
+            registry.add(Tenant(f'token-{index}', index))
+        scheduler = Scheduler(registry, None, 600, 2)
+        scheduler.schedule(registry.get('token-0'), 600)
+        scheduler.schedule(registry.get('token-1'), 0)
+        scheduler.pause(registry.get('token-2'))
+        scheduler.remove(registry.get('token-3'))
+        scheduler.running.add('token-4')
+        assert scheduler.due_count() == 2, (
+            'Устаревшие записи, удалённые, приостановленные и уже '
+            'опрашиваемые подписки не должны считаться ожидающими'
+        )
+        assert scheduler.due_count() == len(scheduler.due())
+
+    def test_run_async_bounds_concurrency(self):
+        registry = TenantRegistry()
+        for index in range(5):
+            registry.add(Tenant(f'token-{index}', index))
+        active = set()
+        concurrent = []
+        taken = []
+
+        async def poll(tenant):
+            active.add(tenant.token)
+            concurrent.append(len(active))
+            taken.append(scheduler.in_flight)
+            await asyncio.sleep(0.05)
+            active.discard(tenant.token)
+            if tenant.token == 'token-0':
+                raise RuntimeError('boom')
+
+        scheduler = Scheduler(registry, poll, 600, 2, queue_size=1)
+
+        async def run():
+            task = asyncio.ensure_future(scheduler.run_async())
+            while len(concurrent) < 5:
+                await asyncio.sleep(0.01)
+            scheduler.stop()
+            await task
+
+        asyncio.run(run())
+        assert max(concurrent) == 2, (
+            'Одновременно должно идти не больше max_workers опросов'
+        )
+        assert max(taken) <= 3, (
+            'Взятых опросов не больше max_workers + queue_size'
+        )
+        assert scheduler.in_flight == 0 and scheduler.running == set()
+        assert scheduler.due() == [], (
+            'Опрошенные подписки, и упавшая тоже, ждут следующего срока'
+        )
@@ -0,0 +1,38 @@
+from sharding import HashRing, owned_tenants
+from tenants import Tenant, TenantRegistry
+
+
+class TestSharding:
+    KEYS = [f'tenant-{index}' for index in range(2000)]
+
+    def test_each_key_has_one_owner(self):
+        ring = HashRing(['a', 'b', 'c'])
+        owners = {key: ring.node_for(key) for key in self.KEYS}
+        assert set(owners.values()) == {'a', 'b', 'c'}
+        shares = [list(owners.values()).count(node) for node in 'abc']
+        assert min(shares) > len(self.KEYS) / 6, (
+            'Проверьте, что подписки распределяются по воркерам равномерно'
+        )
+
+    def test_minimal_movement(self):
+        ring = HashRing(['a', 'b', 'c'])
+        before = {key: ring.node_for(key) for key in self.KEYS}
+        ring.add('d')
+        after = {key: ring.node_for(key) for key in self.KEYS}
+        moved = [key for key in self.KEYS if before[key] != after[key]]
+        assert all(after[key] == 'd' for key in moved), (
+            'При добавлении воркера подписки переезжают только на него'
+        )
+        assert len(moved) < len(self.KEYS) / 2
+        ring.remove('d')
+        assert before == {key: ring.node_for(key) for key in self.KEYS}
+
+    def test_owned_tenants_partition(self):
+        registry = TenantRegistry()
+        for index in range(100):
+            registry.add(Tenant(f'token-{index}', index))
+        ring = HashRing(['a', 'b'])
+        shards = [owned_tenants(registry, ring, node) for node in 'ab']
+        assert sum(len(shard) for shard in shards) == 100, (
+            'Каждая подписка должна достаться ровно одному воркеру'
+        )
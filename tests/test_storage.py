@@ -0,0 +1,123 @@
+import json
+import sqlite3
+
+from scheduler import Scheduler
+from storage import (
+    OutboxStore, SQLiteOutboxStore, SQLiteStateStore, StateStore)
+from tenants import Status, Tenant, TenantRegistry
+
+
+class TestStorage:
+
+    def test_sqlite_store_survives_restart(self, tmp_path):
+        path = str(tmp_path / 'state.db')
+        store = SQLiteStateStore(path)
+        tenant = Tenant('token', 1, from_date=123)
+        tenant.status = Status.REVIEWING
+        tenant.statuses = {'1': Status.REVIEWING}
+        store.save(tenant)
+        store.close()
+
+        registry = TenantRegistry()
+        registry.add(Tenant('token', 1))
+        restored = SQLiteStateStore(path)
+        assert restored.restore(registry) == 1
+        tenant = registry.get('token')
+        assert tenant.from_date == 123, (
+            'Проверьте, что курсор восстанавливается после перезапуска'
+        )
+        assert tenant.status == Status.REVIEWING
+        assert tenant.statuses == {'1': Status.REVIEWING}
+        restored.close()
+
+    def test_writes_are_batched(self):
+        store = StateStore(batch_size=3, flush_interval=3600)
+        tenants = [Tenant(str(index), index) for index in range(3)]
+        for tenant in tenants[:2]:
+            store.save(tenant)
+        assert store.load(tenants[0].key) is None, (
+            'Записи должны копиться в буфере до заполнения пачки'
+        )
+        store.save(tenants[2])
+        assert all(store.load(tenant.key) for tenant in tenants)
+
+    def test_warm_restart_keeps_schedule(self):
+        registry = TenantRegistry()
+        tenant = Tenant('token', 1)
+        tenant.next_poll = tenant.changed_at + 300
+        registry.add(tenant)
+        scheduler = Scheduler(registry, None, 600, 1)
+        assert scheduler.due() == [], (
+            'После перезапуска подписка не должна опрашиваться раньше срока'
+        )
+
+    def test_sqlite_outbox_survives_restart(self, tmp_path):
+        path = str(tmp_path / 'state.db')
+        outbox = SQLiteOutboxStore(path)
+        assert outbox.add('a', 1, ('hw1', Status.APPROVED, 't', 'a'))
+        assert outbox.add('b', '2', ('hw2', Status.REJECTED, 't', 'b'))
+        assert not outbox.add('a', 1, ('hw1', Status.APPROVED, 't', 'a')), (
+            'Повтор ключа не должен попадать в журнал'
+        )
+        outbox.complete(['a'])
+        outbox.close()
+
+        restored = SQLiteOutboxStore(path)
+        assert restored.pending() == [('2', ('hw2', 3, 't', 'b'))], (
+            'После перезапуска должны остаться только недоставленные'
+        )
+        assert not restored.add('a', 1, ('hw1', Status.APPROVED, 't', 'a'))
+        restored.prune(float('inf'))
+        assert restored.add('a', 1, ('hw1', Status.APPROVED, 't', 'a'))
+        restored.close()
+
+    def test_outbox_pruned_while_running(self, tmp_path):
+        for outbox in (
+            OutboxStore(retention=-1, prune_interval=0),
+            SQLiteOutboxStore(
+                str(tmp_path / 'state.db'), retention=-1, prune_interval=0),
+        ):
+            outbox.add('a', 1, ('hw1', Status.APPROVED, 't', 'a'))
+            outbox.complete(['a'])
+            outbox.add('b', 1, ('hw2', Status.APPROVED, 't', 'b'))
+            outbox.complete(['b'])
+            assert outbox.add('a', 1, ('hw1', Status.APPROVED, 't', 'a')), (
+                'Доставленные записи должны удаляться и без перезапуска'
+            )
+            assert outbox.pending() == [
+                (1, ('hw1', Status.APPROVED, 't', 'a'))]
+            outbox.close()
+
+    def test_outbox_pending_by_owner(self, tmp_path):
+        for outbox in (
+            OutboxStore(), SQLiteOutboxStore(str(tmp_path / 'state.db'))
+        ):
+            outbox.add('t1:a', 1, ('hw1', Status.APPROVED, 't1', 't1:a'),
+                       't1')
+            outbox.add('t2:b', 2, ('hw2', Status.APPROVED, 't2', 't2:b'),
+                       't2')
+            assert outbox.pending(lambda tenant: tenant == 't2') == [
+                (2, ('hw2', Status.APPROVED, 't2', 't2:b'))], (
+                'Воркер должен поднимать из журнала только свои подписки'
+            )
+            assert len(outbox.pending()) == 2
+            outbox.close()
+
+    def test_outbox_owner_migrated(self, tmp_path):
+        path = str(tmp_path / 'state.db')
+        db = sqlite3.connect(path)
+        db.execute(
+            'CREATE TABLE outbox (key TEXT PRIMARY KEY, chat_id, '
+            'notice TEXT, created_at REAL, sent_at REAL)')
+        db.execute(
+            'INSERT INTO outbox VALUES (?, ?, ?, ?, NULL)',
+            ('t1:a:3:0', 1, json.dumps(['hw1', 3, 't1', 't1:a:3:0']), 0))
+        db.commit()
+        db.close()
+        outbox = SQLiteOutboxStore(path)
+        assert outbox.pending(lambda tenant: tenant == 't1') == [
+            (1, ('hw1', 3, 't1', 't1:a:3:0'))], (
+            'Записи старой таблицы должны получить подписку из ключа'
+        )
+        assert outbox.pending(lambda tenant: tenant == 't2') == []
+        outbox.close()
@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+from streaming import HomeworkStream, compile_schema
+from tenants import Tenant
+
+
+def chunked(data, size):
+    raw = json.dumps(data).encode()
+    return [raw[index:index + size] for index in range(0, len(raw), size)]
+
+
+class FakeStreamResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self.data = data
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        return iter(chunked(self.data, 10))
+
+    def close(self):
+        self.closed = True
+
+
+class FakeStreamSession:
+
+    def __init__(self, data):
+        self.response = FakeStreamResponse(data)
+        self.params = None
+
+    def get(self, url, params=None, stream=False, **kwargs):
+        assert stream, 'Полная история должна читаться потоком'
+        self.params = params
+        return self.response
+
+
+class TestStreaming:
+    HOMEWORKS = [
+        {'id': index, 'homework_name': f'hw{index}', 'status': 'approved'}
+        for index in range(50)
+    ]
+
+    @pytest.mark.parametrize('size', [1, 3, 64, 100000])
+    def test_yields_homeworks_one_by_one(self, size):
+        data = {'homeworks': self.HOMEWORKS, 'current_date': 123}
+        stream = HomeworkStream(chunked(data, size))
+        assert list(stream) == self.HOMEWORKS, (
+            'Проверьте разбор ответа, пришедшего произвольными кусками'
+        )
+        assert stream.current_date == 123
+
+    def test_malformed_homework_fails_fast(self):
+        data = {
+            'homeworks': [self.HOMEWORKS[0], {'status': 'approved'}] * 10,
+            'current_date': 1,
+        }
+        stream = iter(HomeworkStream(chunked(data, 16)))
+        assert next(stream) == self.HOMEWORKS[0]
+        with pytest.raises(KeyError):
+            next(stream)
+
+    def test_invalid_payloads(self):
+        with pytest.raises(TypeError):
+            list(HomeworkStream([b'[]']))
+        with pytest.raises(TypeError):
+            list(HomeworkStream(chunked(
+                {'homeworks': {}, 'current_date': 1}, 4)))
+        with pytest.raises(KeyError):
+            list(HomeworkStream(chunked({'homeworks': []}, 4)))
+        with pytest.raises(ValueError):
+            list(HomeworkStream([b'{"homeworks": [{"homework_name": "hw']))
+
+    def test_compiled_schema(self):
+        validate = compile_schema({'status': str})
+        assert validate({'status': 'approved'})
+        with pytest.raises(TypeError):
+            validate({'status': 1})
+
+    def test_full_history_poll_streams(self):
+        import homework
+
+        class Notifier:
+            sent = []
+
+            def put(self, chat_id, notice):
+                self.sent.append(notice)
+
+        session = FakeStreamSession(
+            {'homeworks': self.HOMEWORKS, 'current_date': 500})
+        tenant = Tenant('token', 1, from_date=0)
+        homework.poll_tenant(Notifier(), tenant, session)
+        assert session.params == {'from_date': 0}
+        assert len(tenant.statuses) == 50
+        assert tenant.from_date == 500
+        assert session.response.closed, (
+            'Проверьте, что потоковый ответ закрывается после чтения'
+        )
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from templates import TemplateRegistry, compile_template
+from tenants import Status, load_tenants
+
+VERDICTS = {
+    Status.APPROVED: 'Одобрено.',
+    Status.REVIEWING: 'На проверке.',
+    Status.REJECTED: 'Есть замечания.',
+}
+
+
+class TestTemplates:
+
+    def test_default_locale(self):
+        templates = TemplateRegistry(VERDICTS)
+        assert templates.render('hw', Status.APPROVED, 'ru') == (
+            'Изменился статус проверки работы "hw". Одобрено.'
+        )
+
+    def test_chat_locale(self):
+        templates = TemplateRegistry(VERDICTS)
+        templates.set_locale(42, 'en')
+        assert templates.locale_for(42) == 'en'
+        assert templates.locale_for(43) == 'ru'
+        message = templates.render('hw', Status.REJECTED, 'en')
+        assert message.startswith('Review status of "hw"'), (
+            'Проверьте, что для чата используется его язык'
+        )
+        with pytest.raises(ValueError):
+            templates.set_locale(42, 'xx')
+
+    def test_custom_template_and_cache(self):
+        templates = TemplateRegistry(VERDICTS)
+        templates.set_template('key', '{homework_name}: {verdict}')
+        assert templates.render('hw', Status.REVIEWING, 'ru', 'key') == (
+            'hw: На проверке.'
+        )
+        templates.render('hw', Status.REVIEWING, 'ru', 'key')
+        assert templates.render.cache_info().hits == 1, (
+            'Готовые тексты должны браться из кэша'
+        )
+        with pytest.raises(ValueError):
+            templates.set_template('key', '{unknown}')
+
+    def test_tenants_file_settings(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'token': 'a', 'chat_id': 1, 'locale': 'en'},
+            {'token': 'b', 'chat_id': 2, 'template': '{verdict}'},
+        ]))
+        templates = TemplateRegistry(VERDICTS)
+        registry = load_tenants(str(path), templates=templates)
+        assert templates.locale_for(1) == 'en'
+        assert templates.render(
+            'hw', Status.APPROVED, 'ru', registry.get('b').key) == 'Одобрено.'
+
+    def test_bad_format_rejected_on_load(self):
+        for template in ('{verdict:d}', '{homework_name!z}', '{verdict'):
+            with pytest.raises(ValueError):
+                compile_template(template)
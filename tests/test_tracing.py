@@ -0,0 +1,77 @@
+import json
+import threading
+import time
+
+import tracing
+from metrics import timed
+
+
+@tracing.traced('work')
+def work():
+    time.sleep(0.01)
+    return 'done'
+
+
+@timed('traced_metric')
+def measured():
+    return 'done'
+
+
+def busy(stopping):
+    while not stopping.is_set():
+        sum(range(1000))
+
+
+class TestTracing:
+
+    def test_disabled_tracing_records_nothing(self):
+        assert tracing.TRACER is None
+        assert work() == 'done'
+        assert tracing.TRACER is None, (
+            'Без TRACE_FILE трассировка не должна включаться'
+        )
+
+    def test_spans_written_as_chrome_trace(self, tmp_path):
+        path = tmp_path / 'trace.json'
+        tracing.start_tracing(str(path))
+        try:
+            work()
+            measured()
+        finally:
+            tracing.stop_tracing()
+        trace = json.loads(path.read_text())
+        spans = {
+            event['name']: event for event in trace['traceEvents']
+            if event['ph'] == 'X'
+        }
+        assert set(spans) == {'work', 'traced_metric'}, (
+            'В трассу должны попадать и traced, и timed функции'
+        )
+        assert spans['work']['dur'] >= 10000, (
+            'Длительность отрезка задаётся в микросекундах'
+        )
+        assert any(
+            event['ph'] == 'M' for event in trace['traceEvents'])
+
+    def test_max_events(self, tmp_path):
+        tracer = tracing.Tracer(str(tmp_path / 'trace.json'), max_events=2)
+        for _ in range(5):
+            tracer.add('work', 0, 1)
+        assert len(tracer.events) == 2
+        assert tracer.dropped == 3
+
+    def test_sampling_profiler(self, tmp_path):
+        path = tmp_path / 'profile.folded'
+        stopping = threading.Event()
+        thread = threading.Thread(target=busy, args=(stopping,))
+        thread.start()
+        profiler = tracing.SamplingProfiler(str(path), 0.001).start()
+        time.sleep(0.1)
+        profiler.stop()
+        stopping.set()
+        thread.join()
+        lines = path.read_text().splitlines()
+        assert any('busy (test_tracing.py' in line for line in lines), (
+            'Профиль должен содержать стеки работающих потоков'
+        )
+        assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
@@ -0,0 +1,109 @@
+import json
+from http.client import HTTPConnection
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+from storage import StateStore
+from tenants import Tenant, TenantRegistry
+from webhook import start_webhook_server
+
+
+class FakeNotifier:
+
+    def __init__(self):
+        self.sent = []
+
+    def put(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+
+class TestWebhook:
+
+    @pytest.fixture
+    def server(self):
+        import homework
+
+        registry = TenantRegistry()
+        registry.add(Tenant('token', 42, from_date=10))
+        notifier = FakeNotifier()
+        store = StateStore()
+        server = start_webhook_server(
+            0, registry,
+            lambda tenant, payload: homework.handle_push(
+                notifier, store, tenant, payload))
+        server.notifier = notifier
+        server.registry = registry
+        yield server
+        server.shutdown()
+        server.server_close()
+
+    def post(self, server, payload, token='token'):
+        port = server.server_address[1]
+        request = Request(
+            f'http://127.0.0.1:{port}/homeworks',
+            data=json.dumps(payload).encode(),
+            headers={'Authorization': f'OAuth {token}'})
+        try:
+            with urlopen(request) as response:
+                return response.status
+        except HTTPError as error:
+            return error.code
+
+    def test_push_event_notifies(self, server):
+        payload = {
+            'homeworks': [{'homework_name': 'hw1', 'status': 'approved'}],
+            'current_date': 1000,
+        }
+        assert self.post(server, payload) == 202
+        assert server.notifier.sent and server.notifier.sent[0][0] == 42, (
+            'Проверьте, что push-событие превращается в уведомление'
+        )
+        assert server.registry.get('token').from_date == 10, (
+            'Push-событие не должно сдвигать курсор опроса'
+        )
+
+    def test_invalid_push_rejected(self, server):
+        assert self.post(server, {'homeworks': {}}) == 400
+        payload = {
+            'homeworks': [{'homework_name': 'hw1', 'status': 'unknown'}],
+            'current_date': 1000,
+        }
+        assert self.post(server, payload) == 400, (
+            'Проверьте, что событие с неизвестным статусом отклоняется'
+        )
+        for entry in (1, None, 'hw1', ['hw1']):
+            payload = {'homeworks': [entry], 'current_date': 0}
+            assert self.post(server, payload) == 400, (
+                'Домашка не в виде словаря должна давать 400, а не обрыв'
+            )
+        assert server.notifier.sent == []
+
+    def test_unknown_token_rejected(self, server):
+        assert self.post(server, {}, token='other') == 401
+
+    def test_bad_content_length_rejected(self, server):
+        port = server.server_address[1]
+        for length, code in ((None, 411), ('-1', 400), ('1x', 400),
+                             (str(10 ** 9), 413)):
+            connection = HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.putrequest('POST', '/homeworks')
+            connection.putheader('Authorization', 'OAuth token')
+            if length is not None:
+                connection.putheader('Content-Length', length)
+            connection.endheaders()
+            assert connection.getresponse().status == code, (
+                f'Проверьте ответ на Content-Length: {length}'
+            )
+            connection.close()
+        assert server.notifier.sent == []
+
+    def test_push_mode_requires_port(self, monkeypatch):
+        import homework
+
+        monkeypatch.setattr(homework, 'INGESTION_MODE', 'push')
+        monkeypatch.setattr(homework, 'WEBHOOK_PORT', None)
+        monkeypatch.setattr(homework, 'check_tokens', lambda: True)
+        with pytest.raises(SystemExit, match='WEBHOOK_PORT'):
+            homework.main()
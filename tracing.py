@@ -0,0 +1,155 @@
+import atexit
+import collections
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+from app_logger import get_logger
+
+logger = get_logger(__name__)
+
+MAX_EVENTS = 100000
+TRACER = None
+
+
+class Tracer:
+    """Собирает отрезки работы в формате Chrome Trace Event.
+    Файл открывается в chrome://tracing или Perfetto. Сверх
+    max_events отрезки отбрасываются, чтобы не расти в памяти.
+    """
+
+    def __init__(self, path, max_events=MAX_EVENTS):
+        self.path = path
+        self.max_events = max_events
+        self.events = []
+        self.dropped = 0
+        self._threads = {}
+        self._pid = os.getpid()
+
+    def add(self, name, started, duration):
+        """Добавляет отрезок: начало по perf_counter и длительность."""
+        if len(self.events) >= self.max_events:
+            self.dropped += 1
+            return
+        tid = threading.get_ident()
+        if tid not in self._threads:
+            self._threads[tid] = threading.current_thread().name
+        self.events.append({
+            'name': name,
+            'ph': 'X',
+            'ts': started * 1e6,
+            'dur': duration * 1e6,
+            'pid': self._pid,
+            'tid': tid,
+        })
+
+    def write(self):
+        """Записывает собранные отрезки в файл."""
+        names = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': self._pid,
+             'tid': tid, 'args': {'name': name}}
+            for tid, name in list(self._threads.items())
+        ]
+        with open(self.path, 'w', encoding='utf-8') as file:
+            json.dump({
+                'traceEvents': names + self.events,
+                'displayTimeUnit': 'ms',
+            }, file)
+        logger.info(
+            'Трасса записана в %s: отрезков %s, отброшено %s',
+            self.path, len(self.events), self.dropped)
+
+
+def start_tracing(path, max_events=MAX_EVENTS):
+    """Включает трассировку; файл пишется при остановке."""
+    global TRACER
+    TRACER = Tracer(path, max_events)
+    atexit.register(stop_tracing)
+    return TRACER
+
+
+def stop_tracing():
+    """Выключает трассировку и записывает файл."""
+    global TRACER
+    tracer, TRACER = TRACER, None
+    if tracer is not None:
+        tracer.write()
+
+
+def traced(name):
+    """Декоратор: отрезок трассы на каждый вызов функции.
+    Пока трассировка выключена, обходится одной проверкой.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = TRACER
+            if tracer is None:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                tracer.add(name, started, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+class SamplingProfiler:
+    """Сэмплирующий профилировщик.
+    Раз в interval секунд снимает стеки всех потоков и считает
+    одинаковые. Результат - свёрнутые стеки для flamegraph.pl
+    и speedscope.
+    """
+
+    def __init__(self, path, interval=0.005):
+        self.path = path
+        self.interval = interval
+        self.samples = collections.Counter()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Запускает поток сэмплирования."""
+        self._thread = threading.Thread(
+            target=self.run, name='profiler', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def run(self):
+        """Цикл сэмплирования."""
+        own = threading.get_ident()
+        while not self._stopping.wait(self.interval):
+            for tid, frame in sys._current_frames().items():
+                if tid != own:
+                    self.samples[stack_of(frame)] += 1
+
+    def stop(self):
+        """Останавливает сэмплирование и записывает стеки."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+        with open(self.path, 'w', encoding='utf-8') as file:
+            for stack, count in self.samples.most_common():
+                file.write(f'{stack} {count}\n')
+        logger.info(
+            'Профиль записан в %s: сэмплов %s',
+            self.path, sum(self.samples.values()))
+
+
+def stack_of(frame):
+    """Стек кадра одной строкой от корня: функция (файл:строка)."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(
+            f'{code.co_name} ({os.path.basename(code.co_filename)}'
+            f':{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
@@ -0,0 +1,76 @@
+import json
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app_logger import get_logger
+
+logger = get_logger(__name__)
+
+MAX_BODY_SIZE = 1024 * 1024
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """Принимает POST /homeworks с телом в формате ответа API.
+    Подписка определяется по заголовку Authorization: OAuth <токен>.
+    """
+
+    registry = None
+    on_event = None
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/homeworks':
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        token = self.headers.get('Authorization', '').partition('OAuth ')[2]
+        tenant = self.registry.get(token) if token else None
+        if tenant is None:
+            self.send_error(HTTPStatus.UNAUTHORIZED)
+            return
+        length = self.content_length()
+        if length is None:
+            return
+        try:
+            payload = json.loads(self.rfile.read(length))
+            self.on_event(tenant, payload)
+        except (ValueError, TypeError, KeyError) as error:
+            logger.warning('Отклонено push-событие для %r: %s', tenant, error)
+            self.send_error(HTTPStatus.BAD_REQUEST, explain=str(error))
+            return
+        self.send_response(HTTPStatus.ACCEPTED)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def content_length(self):
+        """Длина тела из заголовка; при ошибке отвечает сам и вернёт None.
+        Без заголовка - 411, не число или отрицательное - 400.
+        """
+        length = self.headers.get('Content-Length')
+        if length is None:
+            self.send_error(HTTPStatus.LENGTH_REQUIRED)
+            return None
+        if not length.isdigit():
+            self.send_error(HTTPStatus.BAD_REQUEST)
+            return None
+        if int(length) > MAX_BODY_SIZE:
+            self.send_error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+            return None
+        return int(length)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_webhook_server(port, registry, handle, host='127.0.0.1'):
+    """Запускает приёмник push-событий в фоновом потоке.
+    handle(tenant, payload) проверяет событие и ставит уведомления.
+    """
+    handler = type('Handler', (WebhookHandler,), {
+        'registry': registry,
+        'on_event': staticmethod(handle),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(
+        target=server.serve_forever, name='webhook', daemon=True).start()
+    logger.info('Приём push-событий на %s:%s', host, server.server_address[1])
+    return server